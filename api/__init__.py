@@ -1,14 +1,37 @@
+import os
+
 from apiflask import APIFlask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 
 from config import Config
+from .cache import create_backend, MemoryBackend
+from .hashing import PasswordHasher
+from .last_seen import LastSeenBuffer
+from .serialization import orjson, OrjsonProvider
+from .token_cache import TokenCache
+from .username_index import UsernameIndex
 
 db = SQLAlchemy()
 migrate = Migrate()
 cors = CORS()
 
+def include_object(obj, name, type_, reflected, compare_to):
+    """Keep migration autogenerate off full-text search objects created by raw DDL."""
+    return not (reflected and compare_to is None and
+                (name.startswith("posts_fts") or name == "ix_posts_search"))
+
+
+def token_invalidation_file(app: APIFlask) -> str:
+    """Return invalidation file shared by token caches of all workers, in instance folder by default."""
+    path = app.config["TOKEN_CACHE_INVALIDATION_FILE"]
+    if path:
+        return path
+    os.makedirs(app.instance_path, exist_ok=True)
+    return os.path.join(app.instance_path, "token-invalidations.log")
+
+
 def create_app(config=Config):
     """Application factory."""
     app = APIFlask(
@@ -18,15 +41,35 @@ def create_app(config=Config):
         docs_ui="elements"
     )
     app.config.from_object(config)
+    app.logger.setLevel(app.config["LOG_LEVEL"])
+    if app.config["JSON_ORJSON"] and orjson is not None:
+        app.json = OrjsonProvider(app)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, include_object=include_object)
     if app.config["USE_CORS"]:
         cors.init_app(app)
+    app.extensions["last_seen"] = LastSeenBuffer(
+        app.config["LAST_SEEN_STALENESS"], app.config["LAST_SEEN_BUFFER_SIZE"])
+    app.extensions["token_cache"] = TokenCache(
+        app.config["TOKEN_CACHE_SIZE"], app.config["TOKEN_CACHE_TTL"],
+        token_invalidation_file(app))
+    app.extensions["password_hasher"] = PasswordHasher(
+        app.config["PASSWORD_HASH_METHOD"], app.config["PASSWORD_HASH_WORKERS"],
+        app.config["PASSWORD_HASH_MAX_PENDING"])
+    app.extensions["response_cache"] = create_backend(app.config)
+    app.extensions["count_cache"] = MemoryBackend(app.config["PAGINATION_COUNT_CACHE_SIZE"])
+    app.extensions["username_index"] = UsernameIndex() if app.config["USERNAME_INDEX"] else None
 
     from . import models
+    from .compression import compress_response
+    from .conditional import add_etag
+    # Hooks run in reverse order, so ETag is computed on uncompressed body.
+    app.after_request(compress_response)
+    app.after_request(add_etag)
 
     register_blueprints(app)
+    start_tasks(app)
 
     return app 
 
@@ -44,4 +87,42 @@ def register_blueprints(app: APIFlask):
 
     from .resources.follows import follows
     app.register_blueprint(follows)
-    
\ No newline at end of file
+
+    from .resources.export import export
+    app.register_blueprint(export)
+
+
+def start_tasks(app: APIFlask):
+    """Start enabled periodic background tasks."""
+    import atexit
+    from functools import partial
+    from .models import Token, User
+    from .search import load_username_index
+    from .tasks import PeriodicTask
+
+    if app.config["TOKEN_PURGE_INTERVAL"]:
+        purge = partial(Token.purge, app.config["TOKEN_PURGE_BATCH_SIZE"],
+                        app.config["TOKEN_PURGE_PAUSE"])
+        task = PeriodicTask(app, app.config["TOKEN_PURGE_INTERVAL"], purge, "token-purge")
+        app.extensions["token_purge"] = task
+        task.start()
+
+    if app.config["LAST_SEEN_FLUSH_INTERVAL"]:
+        task = PeriodicTask(app, app.config["LAST_SEEN_FLUSH_INTERVAL"],
+                            User.flush_last_seen, "last-seen-flush")
+        app.extensions["last_seen_flush"] = task
+        task.start()
+        # Idle or exiting worker would otherwise keep its buffer forever.
+        atexit.register(task.run_once)
+
+    if app.config["TOKEN_CACHE_STATS_INTERVAL"] and app.config["TOKEN_CACHE_SIZE"]:
+        task = PeriodicTask(app, app.config["TOKEN_CACHE_STATS_INTERVAL"],
+                            app.extensions["token_cache"].stats, "token-cache-stats")
+        app.extensions["token_cache_stats"] = task
+        task.start()
+
+    if app.config["USERNAME_INDEX"]:
+        task = PeriodicTask(app, app.config["USERNAME_INDEX_REFRESH_INTERVAL"],
+                            load_username_index, "username-index", immediate=True)
+        app.extensions["username_index_refresh"] = task
+        task.start()
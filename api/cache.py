@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request
+
+
+class MemoryBackend:
+    """In-process LRU cache backend with per-entry expiration."""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return cached value or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: int):
+        """Cache value for ttl seconds."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace: str) -> int:
+        """Return current generation of namespace."""
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace: str):
+        """Start new generation of namespace, orphaning its entries."""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisBackend:
+    """Cache backend shared by workers, on top of Redis compatible client."""
+
+    def __init__(self, client, prefix: str = "response-cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        """Connect to Redis server at url."""
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str):
+        """Return cached value or None."""
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        """Cache value for ttl seconds."""
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def generation(self, namespace: str) -> int:
+        """Return current generation of namespace."""
+        return int(self.client.get(self.prefix + "generation:" + namespace) or 0)
+
+    def bump(self, namespace: str):
+        """Start new generation of namespace, orphaning its entries."""
+        self.client.incr(self.prefix + "generation:" + namespace)
+
+
+def create_backend(config: dict):
+    """Create response cache backend from config, None if cache is disabled."""
+    cache_type = config["RESPONSE_CACHE_TYPE"]
+    if not cache_type:
+        return None
+    if cache_type == "memory":
+        return MemoryBackend(config["RESPONSE_CACHE_SIZE"])
+    if cache_type == "redis":
+        return RedisBackend.from_url(config["RESPONSE_CACHE_URL"])
+    raise ValueError(f"Unknown response cache type: {cache_type}")
+
+
+def cache_key(namespaces: tuple, backend) -> str:
+    """Build key of current request from path, sorted query args and namespace generations."""
+    generations = ".".join(str(backend.generation(namespace)) for namespace in namespaces)
+    args = urlencode(sorted(request.args.items(multi=True)))
+    return f"{generations}:{request.path}?{args}"
+
+
+def cached(*namespaces: str):
+    """If you decorate view with this, its successful responses are cached.
+
+    Entries belong to given namespaces and are dropped when any of them is
+    invalidated. Time to live comes from RESPONSE_CACHE_TTLS by endpoint,
+    or RESPONSE_CACHE_TTL. Put it right under the route decorator.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            backend = current_app.extensions["response_cache"]
+            if backend is None:
+                return f(*args, **kwargs)
+            key = cache_key(namespaces, backend)
+            data = backend.get(key)
+            if data is not None:
+                response = current_app.response_class(data, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                ttl = current_app.config["RESPONSE_CACHE_TTLS"].get(
+                    request.endpoint, current_app.config["RESPONSE_CACHE_TTL"])
+                backend.set(key, response.get_data(), ttl)
+                response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate(*namespaces: str):
+    """Drop cached responses of namespaces. Call it after changes are committed."""
+    backend = current_app.extensions["response_cache"]
+    if backend is None:
+        return
+    for namespace in namespaces:
+        backend.bump(namespace)
@@ -0,0 +1,117 @@
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipEncoder:
+    """Incremental gzip encoder."""
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    """Incremental brotli encoder."""
+
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    """Incremental zstd encoder."""
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+
+def _stream(chunks, charset: str, encoder):
+    """Compress streamed response chunk by chunk, flushing after each one."""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            if chunk:
+                yield encoder.process(chunk) + encoder.flush()
+        yield encoder.finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response):
+    """Compress response body with best encoding client accepts.
+
+    Levels are configured per mimetype, other mimetypes are sent as is.
+    Bodies under COMPRESS_MIN_SIZE are not worth it, streamed ones are
+    always compressed since their size is not known up front.
+    """
+    config = current_app.config
+    levels = config["COMPRESS_LEVELS"].get(response.mimetype)
+    if not config["COMPRESS"] or levels is None or response.status_code < 200 \
+            or response.status_code in (204, 304) or response.direct_passthrough \
+            or "Content-Encoding" in response.headers:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    available = [name for name in config["COMPRESS_ALGORITHMS"] if name in ENCODERS and name in levels]
+    encoding = request.accept_encodings.best_match(available)
+    if encoding is None or request.method == "HEAD":
+        return response
+    encoder = ENCODERS[encoding]
+
+    if response.is_streamed:
+        response.response = _stream(response.response, response.charset,
+                                    encoder(levels[encoding]))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        encoder = encoder(levels[encoding])
+        response.set_data(encoder.process(data) + encoder.finish())
+    response.headers["Content-Encoding"] = encoding
+    return response
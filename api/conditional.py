@@ -0,0 +1,48 @@
+from functools import wraps
+
+from flask import current_app, request
+from werkzeug.http import generate_etag
+
+
+def add_etag(response):
+    """Tag successful JSON GET responses with weak ETag of body and answer conditional requests."""
+    if request.method not in ("GET", "HEAD") or response.status_code != 200 \
+            or not response.is_json or response.is_streamed:
+        return response
+    if response.get_etag() == (None, None):
+        response.add_etag(weak=True)
+    return response.make_conditional(request)
+
+
+def version_etag(versions: tuple) -> str:
+    """Build ETag of resource versions, distinct per representation requested."""
+    key = "|".join([request.full_path] + [v.isoformat() for v in versions])
+    return generate_etag(key.encode())
+
+
+def conditional(version):
+    """If you decorate view with this, conditional GET is answered before view runs.
+
+    'version' gets view arguments and returns update times of rows the
+    response is made of, or None to let view handle missing resource.
+    Put it right under the route decorator.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            versions = version(*args, **kwargs)
+            if versions is None or None in versions:
+                return f(*args, **kwargs)
+            etag, last_modified = version_etag(versions), max(versions)
+            response = current_app.response_class()
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            if response.make_conditional(request).status_code == 304:
+                return response
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
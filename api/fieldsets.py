@@ -0,0 +1,72 @@
+from functools import lru_cache, wraps
+
+from apiflask import abort, fields, Schema
+from flask import jsonify, request
+
+
+def _nested_schemas(schema: Schema):
+    for field in schema.dump_fields.values():
+        field = getattr(field, "inner", field)
+        if isinstance(field, fields.Nested):
+            yield field.schema
+
+
+@lru_cache(maxsize=256)
+def _restricted(schema_cls: type, many: bool, only: frozenset) -> Schema:
+    schema = schema_cls(only=only, many=many)
+    # Nested schemas check their part of 'only' when first built.
+    pending = [schema]
+    while pending:
+        pending.extend(_nested_schemas(pending.pop()))
+    return schema
+
+
+def requested_fields(views: dict = None):
+    """Return names of fields asked for with ?fields= or ?view=, None if all are."""
+    value = request.args.get("fields")
+    if value:
+        return {name.strip() for name in value.split(",") if name.strip()}
+    view = request.args.get("view")
+    if not view:
+        return None
+    if views is None or view not in views:
+        abort(400, "Invalid view")
+    return set(views[view])
+
+
+def restrict(schema: Schema, collection: str = None, views: dict = None) -> Schema:
+    """Return schema restricted to fields asked for, or schema itself.
+
+    Fields are comma separated in ?fields=, nested ones dotted like
+    'author.username', or ?view= names one of predefined field sets in
+    views. With collection, fields name items of that collection field and
+    other fields of schema, like pagination, are kept. Restricted
+    instances are reused, so their compiled dumpers are too.
+    """
+    names = requested_fields(views)
+    if names is None:
+        return schema
+    if collection is not None:
+        names = {f"{collection}.{name}" for name in names} | (set(schema.fields) - {collection})
+    try:
+        return _restricted(type(schema), schema.many, frozenset(names))
+    except ValueError:
+        abort(400, "Invalid fields")
+
+
+def sparse(schema: Schema, collection: str = None, views: dict = None):
+    """If you decorate view with this, ?fields= and ?view= will restrict fields of its response.
+
+    Goes under the output decorator, which dumps unrestricted responses
+    as usual, and above decorators building the response object.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            rv = f(*args, **kwargs)
+            restricted = restrict(schema, collection, views)
+            if restricted is schema:
+                return rv
+            return jsonify(restricted.dump(rv))
+        return wrapper
+    return decorator
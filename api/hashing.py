@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from apiflask import abort
+from werkzeug.security import (
+    check_password_hash, DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+)
+
+
+def normalize_method(method: str) -> str:
+    """Spell out defaults of werkzeug hash method, the way it is stored in hashes."""
+    if not method.startswith("pbkdf2"):
+        return method
+    parts = method.split(":")
+    name = parts[1] if len(parts) > 1 else "sha256"
+    iterations = parts[2] if len(parts) > 2 else DEFAULT_PBKDF2_ITERATIONS
+    return f"pbkdf2:{name}:{iterations}"
+
+
+class PasswordHasher:
+    """Password hashing in bounded thread pool.
+
+    PBKDF2 releases the GIL, so hashing in 'max_workers' threads leaves
+    CPU to request threads of the same process. At most 'max_pending'
+    hashes are running or waiting for a free thread at once, further ones
+    are rejected with 503 instead of piling up. Cap only matters with
+    threaded workers, a sync worker never has more than one hash pending.
+    0 workers hash inline in the calling thread.
+    """
+
+    def __init__(self, method: str = "pbkdf2:sha256", max_workers: int = 2, max_pending: int = 32):
+        self.method = normalize_method(method)
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers, "password-hash") if max_workers else None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                abort(503, "Too many concurrent password checks, try again later")
+            self._pending += 1
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password: str) -> str:
+        """Hash password with configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """Check password against hash made with any method."""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Check if hash was made with other method than configured one."""
+        return password_hash.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        """Stop worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -0,0 +1,38 @@
+import threading
+from datetime import datetime, timedelta
+
+
+class LastSeenBuffer:
+    """Coalesce user last seen times in memory until they are flushed.
+
+    Only the latest time of every user is kept. Buffer asks for a flush
+    once it holds 'max_size' users or its oldest entry is older than
+    'staleness' seconds, so staleness of 0 writes on every ping.
+    """
+
+    def __init__(self, staleness: float = 60, max_size: int = 1000):
+        self.staleness = timedelta(seconds=staleness)
+        self.max_size = max_size
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, user_id: int, seen: datetime) -> bool:
+        """Remember user last seen time and tell if buffer should be flushed."""
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = seen
+            previous = self._pending.get(user_id)
+            if previous is None or previous < seen:
+                self._pending[user_id] = seen
+            return len(self._pending) >= self.max_size or \
+                seen - self._oldest >= self.staleness
+
+    def drain(self) -> dict:
+        """Take all buffered last seen times out of buffer."""
+        with self._lock:
+            pending, self._pending, self._oldest = self._pending, {}, None
+        return pending
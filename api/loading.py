@@ -0,0 +1,48 @@
+from apiflask import fields, Schema
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+
+def dumped_columns(model, schema: Schema, keep: tuple = ()):
+    """Return columns of model schema dumps, or None if schema dumps all its fields.
+
+    Schemas restricted with 'only' do not need other columns loaded, so
+    large ones are left out of SELECT. Primary key and 'keep' columns are
+    always loaded.
+    """
+    if schema.only is None:
+        return None
+    names = {field.attribute or name for name, field in schema.dump_fields.items()}
+    names.update(column.key for column in keep)
+    return [getattr(model, prop.key) for prop in inspect(model).column_attrs
+            if prop.key in names or any(column.primary_key for column in prop.columns)]
+
+
+def eager_options(model, schema: Schema, keep: tuple = ()) -> list:
+    """Build loader options for relationships the schema dumps as nested fields.
+
+    Many-to-one relationships are joined into the main query, collections
+    are loaded with one extra SELECT ... IN query. Dynamic relationships
+    are queries themselves and are left alone. Restricted schemas load
+    only columns they dump, see dumped_columns().
+    """
+    relationships = inspect(model).relationships
+    columns = dumped_columns(model, schema, keep)
+    options = [] if columns is None else [load_only(*columns)]
+    for name, field in schema.dump_fields.items():
+        if not isinstance(field, fields.Nested):
+            continue
+        relationship = relationships.get(field.attribute or name)
+        if relationship is None or relationship.lazy == "dynamic":
+            continue
+        attr = getattr(model, relationship.key)
+        loader = selectinload(attr) if relationship.uselist else joinedload(attr)
+        nested = dumped_columns(relationship.mapper.class_, field.schema)
+        options.append(loader if nested is None else loader.load_only(*nested))
+    return options
+
+
+def eager_load(query, schema: Schema, keep: tuple = ()):
+    """Apply eager loading options for everything schema will dump to query."""
+    model = query.column_descriptions[0]["entity"]
+    return query.options(*eager_options(model, schema, keep))
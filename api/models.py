@@ -1,10 +1,27 @@
 import secrets
+import time
 from datetime import datetime, timedelta
 
 from flask import current_app
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy import and_, bindparam, DDL, event, exists, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import set_committed_value
 
 from . import db 
+from .signed_tokens import is_signed_access_token, load_access_token, sign_access_token
+
+# Characters of post content kept in post excerpt
+EXCERPT_LENGTH = 200
+
+
+def insert_ignore(table):
+    """Build INSERT statement for table that skips rows which already exist."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return table.insert().prefix_with("IGNORE")
 
 
 class Updatable:
@@ -17,8 +34,9 @@ class Updatable:
 # Followers many-to-many table.
 followers = db.Table(
     "followers",
-    db.Column("follower_id", db.Integer, db.ForeignKey("users.user_id")),
-    db.Column("followed_id", db.Integer, db.ForeignKey("users.user_id"))
+    db.Column("follower_id", db.Integer, db.ForeignKey("users.user_id"), primary_key=True),
+    db.Column("followed_id", db.Integer, db.ForeignKey("users.user_id"), primary_key=True),
+    db.Index("ix_followers_followed_id_follower_id", "followed_id", "follower_id")
 )
 
 
@@ -30,22 +48,29 @@ class Token(db.Model):
     access_token = db.Column(db.String(64), nullable=False, index=True)
     access_expiration = db.Column(db.DateTime, nullable=False)
     refresh_token = db.Column(db.String(64), nullable=False, index=True)
-    refresh_expiration = db.Column(db.DateTime, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"))
+    refresh_expiration = db.Column(db.DateTime, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), index=True)
 
     def generate(self):
         """Generate access and refresh tokens."""
-        self.access_token = secrets.token_urlsafe()
         self.access_expiration = datetime.utcnow() + \
             timedelta(minutes=current_app.config["ACCESS_TOKEN_EXPIRE_MINUTES"])
+        if current_app.config["ACCESS_TOKEN_SIGNED"]:
+            self.access_token = sign_access_token(
+                current_app.config["SECRET_KEY"], self.user.user_id, self.access_expiration)
+        else:
+            self.access_token = secrets.token_urlsafe()
         self.refresh_token = secrets.token_urlsafe()
         self.refresh_expiration = datetime.utcnow() + \
             timedelta(days=current_app.config["REFRESH_TOKEN_EXPIRE_DAYS"])
 
     def expire(self):
         """Expire access and refresh tokens."""
-        self.access_expiration = datetime.utcnow()
-        self.refresh_expiration = datetime.utcnow()
+        now = datetime.utcnow()
+        current_app.extensions["token_cache"].invalidate(
+            self.access_token, self.access_expiration, now)
+        self.access_expiration = now
+        self.refresh_expiration = now
 
     @staticmethod
     def clean():
@@ -53,20 +78,163 @@ class Token(db.Model):
         yesterday = datetime.utcnow() - timedelta(days=1)
         Token.query.filter(Token.refresh_expiration < yesterday).delete()
 
+    @staticmethod
+    def purge(batch_size: int = 1000, pause: float = 0) -> int:
+        """Remove tokens expired for more than one day, committing batch_size rows at a time.
+
+        Sleeps pause seconds between batches so other writers can take the
+        table lock. Returns number of removed tokens.
+        """
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        removed = 0
+        while True:
+            ids = [row.token_id for row in db.session.query(Token.token_id)
+                   .filter(Token.refresh_expiration < yesterday).limit(batch_size)]
+            if ids:
+                Token.query.filter(Token.token_id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+                removed += len(ids)
+            if len(ids) < batch_size:
+                return removed
+            time.sleep(pause)
+
 
 class Post(Updatable, db.Model):
     """SQLAlchemy model to represent 'posts' table."""
     __tablename__ = "posts"
+    __table_args__ = (
+        db.Index("ix_posts_author_id_created_at", "author_id", "created_at"),
+    )
 
     post_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(50), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey("users.user_id"))
+    # Preview of content for lists that do not need all of it
+    excerpt = db.Column(db.String(EXCERPT_LENGTH))
 
     def __repr__(self):
         return f"<Post {self.title}>"
 
+    @staticmethod
+    def make_excerpt(content: str) -> str:
+        """Return content on one line, cut at word boundary to fit excerpt column."""
+        content = " ".join(content.split())
+        if len(content) <= EXCERPT_LENGTH:
+            return content
+        cut = content[:EXCERPT_LENGTH - 1]
+        space = cut.rfind(" ")
+        if space > EXCERPT_LENGTH // 2:
+            cut = cut[:space]
+        return cut.rstrip() + "\u2026"
+
+    @db.validates("content")
+    def validate_content(self, key: str, content: str) -> str:
+        """Keep excerpt in sync with content."""
+        self.excerpt = Post.make_excerpt(content)
+        return content
+
+    @staticmethod
+    def fill_excerpts(batch_size: int = 1000, refresh: bool = False) -> int:
+        """Compute excerpts of posts missing them, or of all posts with refresh.
+
+        Posts are read and updated in post_id ranges of batch_size, one
+        transaction per range. Returns number of updated posts.
+        """
+        table = Post.__table__
+        update = table.update().where(table.c.post_id == bindparam("_post_id")) \
+            .values(excerpt=bindparam("_excerpt"))
+        updated = 0
+        last_id = db.session.query(func.max(Post.post_id)).scalar() or 0
+        for start in range(0, last_id, batch_size):
+            query = select(table.c.post_id, table.c.content) \
+                .where(table.c.post_id > start, table.c.post_id <= start + batch_size)
+            if not refresh:
+                query = query.where(table.c.excerpt.is_(None))
+            rows = [{"_post_id": post_id, "_excerpt": Post.make_excerpt(content)}
+                    for post_id, content in db.session.execute(query)]
+            if rows:
+                db.session.execute(update, rows)
+                updated += len(rows)
+            db.session.commit()
+        return updated
+
+    @staticmethod
+    def insert_many(author_id: int, posts: list, chunk_size: int = 100) -> list:
+        """Insert posts with multi-row INSERT statements and return their ids.
+
+        PostgreSQL returns ids with RETURNING. SQLite assigns consecutive
+        rowids within one statement, so they are derived from the last one.
+        Other databases fall back to ORM flush.
+        """
+        now = datetime.utcnow()
+        rows = [dict(post, author_id=author_id, excerpt=Post.make_excerpt(post["content"]),
+                     created_at=now, updated_at=now) for post in posts]
+        table = Post.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            objects = [Post(**row) for row in rows]
+            db.session.add_all(objects)
+            db.session.flush()
+            return [post.post_id for post in objects]
+
+        ids = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if dialect == "postgresql":
+                result = db.session.execute(table.insert().values(chunk).returning(table.c.post_id))
+                ids.extend(row.post_id for row in result)
+            else:
+                last = db.session.execute(table.insert().values(chunk)).lastrowid
+                ids.extend(range(last - len(chunk) + 1, last + 1))
+        return ids
+
+
+# Full-text index of post title and content: external content FTS5 table
+# kept in sync by triggers on SQLite, GIN expression index on PostgreSQL.
+POST_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', content), 'B')"
+)
+POST_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE posts_fts USING fts5(title, content, content='posts', "
+        "content_rowid='post_id', tokenize='porter unicode61')",
+        "CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.post_id, new.title, new.content); END",
+        "CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) "
+        "VALUES ('delete', old.post_id, old.title, old.content); END",
+        "CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN "
+        "INSERT INTO posts_fts(posts_fts, rowid, title, content) "
+        "VALUES ('delete', old.post_id, old.title, old.content); "
+        "INSERT INTO posts_fts(rowid, title, content) VALUES (new.post_id, new.title, new.content); END",
+    ],
+    "postgresql": [
+        f"CREATE INDEX ix_posts_search ON posts USING gin (({POST_SEARCH_VECTOR}))",
+    ],
+}
+for dialect, statements in POST_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Post.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+event.listen(Post.__table__, "after_drop",
+             DDL("DROP TABLE IF EXISTS posts_fts").execute_if(dialect="sqlite"))
+
+
+class TimelineEntry(db.Model):
+    """SQLAlchemy model to represent 'timeline_entries' table."""
+    __tablename__ = "timeline_entries"
+    __table_args__ = (
+        db.Index("ix_timeline_entries_user_id_created_at", "user_id", "created_at", "post_id"),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("posts.post_id"), primary_key=True, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
 
 class User(Updatable, db.Model):
     """SQLAlchemy model to represent 'users' table."""
@@ -74,11 +242,19 @@ class User(Updatable, db.Model):
 
     user_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    # Lowercased copy of username for case-insensitive prefix search
+    username_lower = db.Column(db.String(64), index=True)
     email = db.Column(db.String(120), nullable=False, unique=True, index=True)
     password_hash = db.Column(db.String(128))
     about_me = db.Column(db.String(256))
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     member_since = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    fanout_on_read = db.Column(db.Boolean, nullable=False, default=False,
+                               server_default=db.false())
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    posts_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     tokens = db.relationship("Token", backref="user", cascade="all,delete", lazy="dynamic")
     posts = db.relationship("Post", backref="author", cascade="all,delete", lazy="dynamic")
@@ -89,6 +265,12 @@ class User(Updatable, db.Model):
         secondaryjoin=(followers.c.followed_id == user_id),
         backref=db.backref("followers", lazy="dynamic"), lazy="dynamic")
 
+    @db.validates("username")
+    def validate_username(self, key: str, username: str) -> str:
+        """Keep lowercased username in sync with username."""
+        self.username_lower = username.lower()
+        return username
+
     @property
     def password(self):
         """Password getter."""
@@ -97,15 +279,46 @@ class User(Updatable, db.Model):
     @password.setter
     def password(self, password: str):
         """Password setter."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = current_app.extensions["password_hasher"].hash(password)
 
     def ping(self):
-        """Update user last seen time."""
-        self.last_seen = datetime.utcnow()
+        """Update user last seen time.
+
+        New time is visible on this instance right away, but it is written
+        to database in batches by flush_last_seen() instead of every request,
+        when buffer is full or stale, every LAST_SEEN_FLUSH_INTERVAL seconds
+        and on exit.
+        """
+        now = datetime.utcnow()
+        set_committed_value(self, "last_seen", now)
+        if current_app.extensions["last_seen"].record(self.user_id, now):
+            User.flush_last_seen()
+
+    @staticmethod
+    def flush_last_seen() -> int:
+        """Write buffered last seen times in one batched UPDATE, return number of users."""
+        pending = current_app.extensions["last_seen"].drain()
+        if not pending:
+            return 0
+        table = User.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.user_id == bindparam("_user_id"))
+            .where(or_(table.c.last_seen.is_(None), table.c.last_seen < bindparam("_last_seen")))
+            .values(last_seen=bindparam("_last_seen")),
+            [{"_user_id": user_id, "_last_seen": seen} for user_id, seen in pending.items()]
+        )
+        db.session.commit()
+        return len(pending)
 
     def verify_password(self, password: str) -> bool:
-        """Verify password"""
-        return check_password_hash(self.password_hash, password)
+        """Verify password, rehashing it when hash method has changed."""
+        hasher = current_app.extensions["password_hasher"]
+        if not hasher.check(self.password_hash, password):
+            return False
+        if hasher.needs_rehash(self.password_hash):
+            self.password = password
+        return True
 
     def generate_access_token(self):
         """Generate access and refresh token pair."""
@@ -117,11 +330,26 @@ class User(Updatable, db.Model):
     @staticmethod
     def verify_access_token(access_token):
         """Verify access token and return user instance."""
-        token = Token.query.filter_by(access_token=access_token).first()
-        if token and token.access_expiration > datetime.utcnow():
-            token.user.ping()
-            db.session.commit()
-            return token.user
+        now = datetime.utcnow()
+        cache = current_app.extensions["token_cache"]
+        if current_app.config["ACCESS_TOKEN_SIGNED"] and is_signed_access_token(access_token):
+            claims = load_access_token(current_app.config["SECRET_KEY"], access_token)
+            if claims is None or claims[1] <= now or cache.is_revoked(access_token, now):
+                return None
+            user_id = claims[0]
+        else:
+            user_id = cache.get(access_token, now)
+        if user_id is not None:
+            user = db.session.get(User, user_id)
+        else:
+            token = Token.query.filter_by(access_token=access_token).first()
+            if token is None or token.access_expiration <= now:
+                return None
+            cache.set(access_token, token.user_id, token.access_expiration, now)
+            user = token.user
+        if user is not None:
+            user.ping()
+        return user
 
     @staticmethod
     def verify_refresh_token(refresh_token, access_token):
@@ -133,21 +361,111 @@ class User(Updatable, db.Model):
 
     def is_following(self, user):
         """Check if current user follows user."""
-        return self in user.followers
+        return db.session.query(exists().where(
+            followers.c.follower_id == self.user_id,
+            followers.c.followed_id == user.user_id)).scalar()
 
     def is_followed_by(self, user):
         """Check if current user is followed by user."""
-        return self in user.followed
+        return user.is_following(self)
+
+    def follow_status(self, user_ids: list) -> dict:
+        """Check relationship with every user in one query.
+
+        Returns mapping of user id to (following, followed_by) pair.
+        """
+        status = {user_id: (False, False) for user_id in user_ids}
+        rows = db.session.query(followers.c.follower_id, followers.c.followed_id).filter(or_(
+            and_(followers.c.follower_id == self.user_id, followers.c.followed_id.in_(user_ids)),
+            and_(followers.c.followed_id == self.user_id, followers.c.follower_id.in_(user_ids))))
+        for follower_id, followed_id in rows:
+            if follower_id == self.user_id and followed_id in status:
+                status[followed_id] = (True, status[followed_id][1])
+            if followed_id == self.user_id and follower_id in status:
+                status[follower_id] = (status[follower_id][0], True)
+        return status
+
+    def follow(self, user) -> bool:
+        """Follow user, return False if it was followed already.
+
+        Row is inserted ignoring conflicts, so concurrent follows of the
+        same user count it once instead of failing on primary key.
+        """
+        db.session.flush()
+        inserted = db.session.execute(insert_ignore(followers).values(
+            follower_id=self.user_id, followed_id=user.user_id)).rowcount
+        if inserted:
+            User.adjust_count(User.following_count, [self.user_id], 1)
+            User.adjust_count(User.followers_count, [user.user_id], 1)
+        return bool(inserted)
+
+    def unfollow(self, user) -> bool:
+        """Unfollow user, return False if it was not followed."""
+        deleted = db.session.execute(followers.delete().where(
+            followers.c.follower_id == self.user_id,
+            followers.c.followed_id == user.user_id)).rowcount
+        if deleted:
+            User.adjust_count(User.following_count, [self.user_id], -1)
+            User.adjust_count(User.followers_count, [user.user_id], -1)
+        return bool(deleted)
+
+    def follow_many(self, users: list) -> list:
+        """Follow all given users not followed yet in one INSERT and return them."""
+        followed = {row.followed_id for row in db.session.query(followers.c.followed_id).filter(
+            followers.c.follower_id == self.user_id,
+            followers.c.followed_id.in_([user.user_id for user in users]))}
+        new = [user for user in users if user.user_id not in followed]
+        if new:
+            db.session.execute(insert_ignore(followers).values([
+                {"follower_id": self.user_id, "followed_id": user.user_id} for user in new]))
+            User.adjust_count(User.following_count, [self.user_id], len(new))
+            User.adjust_count(User.followers_count, [user.user_id for user in new], 1)
+        return new
+
+    def unfollow_many(self, user_ids: list) -> list:
+        """Unfollow all given users in one DELETE and return ids of unfollowed ones."""
+        condition = and_(followers.c.follower_id == self.user_id,
+                         followers.c.followed_id.in_(user_ids))
+        unfollowed = [row.followed_id for row in
+                      db.session.query(followers.c.followed_id).filter(condition)]
+        if unfollowed:
+            db.session.execute(followers.delete().where(condition))
+            User.adjust_count(User.following_count, [self.user_id], -len(unfollowed))
+            User.adjust_count(User.followers_count, unfollowed, -1)
+        return unfollowed
 
-    def follow(self, user):
-        """Follow user."""
-        if not self.is_following(user):
-            user.followers.append(self)
+    @staticmethod
+    def adjust_count(column, user_ids: list, delta: int):
+        """Atomically add delta to counter column of given users."""
+        User.query.filter(User.user_id.in_(user_ids)) \
+            .update({column: column + delta}, synchronize_session="evaluate")
 
-    def unfollow(self, user):
-        """Unfollow user."""
-        if self.is_following(user):
-            user.followers.remove(self)
+    @staticmethod
+    def recount(batch_size: int = 1000) -> int:
+        """Recompute counters of all users from followers and posts tables.
+
+        Users are updated in user_id ranges of batch_size, one transaction
+        per range. Returns number of updated users.
+        """
+        table = User.__table__
+        counts = {
+            "followers_count": select(func.count()).select_from(followers)
+                .where(followers.c.followed_id == table.c.user_id).scalar_subquery(),
+            "following_count": select(func.count()).select_from(followers)
+                .where(followers.c.follower_id == table.c.user_id).scalar_subquery(),
+            "posts_count": select(func.count()).select_from(Post.__table__)
+                .where(Post.__table__.c.author_id == table.c.user_id).scalar_subquery(),
+        }
+        updated = 0
+        last_id = db.session.query(func.max(User.user_id)).scalar() or 0
+        for start in range(0, last_id, batch_size):
+            updated += db.session.execute(
+                table.update()
+                .where(table.c.user_id > start, table.c.user_id <= start + batch_size)
+                .values(counts)
+            ).rowcount
+            db.session.commit()
+        return updated
 
     def select_following(self):
         """Select users current user follows."""
@@ -157,6 +475,11 @@ class User(Updatable, db.Model):
         """Select current user followers."""
         return self.followers
 
+    def select_feed(self):
+        """Select posts of users current user follows."""
+        return Post.query.join(followers, followers.c.followed_id == Post.author_id) \
+            .filter(followers.c.follower_id == self.user_id)
+
     def __repr__(self):
         return f"<User {self.username}>"
         
\ No newline at end of file
@@ -0,0 +1,111 @@
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+
+from apiflask import abort
+from flask import current_app
+from sqlalchemy import literal, text, tuple_
+
+from .models import db
+
+
+def encode_cursor(values: list) -> str:
+    """Encode sort key values into opaque cursor."""
+    data = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: tuple) -> list:
+    """Decode opaque cursor into sort key values of given columns."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data, list) or len(data) != len(columns):
+            raise ValueError("Cursor does not match sort key.")
+        values = []
+        for column, value in zip(columns, data):
+            if column.type.python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            else:
+                values.append(column.type.python_type(value))
+        return values
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+        abort(400, "Invalid cursor")
+
+
+def counter_total(count: int):
+    """Return total taken from maintained counter."""
+    return lambda: (count, True)
+
+
+def cached_total(query):
+    """Return total counting query rows, reused for PAGINATION_COUNT_TTL seconds.
+
+    Count is exact when it was just counted and not exact when it comes
+    from cache.
+    """
+    def total():
+        cache = current_app.extensions["count_cache"]
+        statement = query.statement.compile(db.session.get_bind())
+        key = hashlib.sha256(f"{statement}|{sorted(statement.params.items())}".encode()).hexdigest()
+        count = cache.get(key)
+        if count is not None:
+            return count, False
+        count = query.order_by(None).count()
+        cache.set(key, count, current_app.config["PAGINATION_COUNT_TTL"])
+        return count, True
+    return total
+
+
+def table_total(model):
+    """Return total of all model rows, estimated by planner statistics on PostgreSQL."""
+    def total():
+        if db.session.get_bind().dialect.name == "postgresql":
+            estimate = db.session.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                {"name": model.__tablename__}).scalar()
+            # Tables never vacuumed or analyzed have no estimate yet.
+            if estimate is not None and estimate >= 0:
+                return int(estimate), False
+        return cached_total(model.query)()
+    return total
+
+
+def page_info(pagination: dict, next_cursor: str, total) -> dict:
+    """Return pagination info, with total and its exactness if it was asked for."""
+    info = dict(pagination, next_cursor=next_cursor)
+    if info.pop("with_total", False):
+        info["total"], info["total_exact"] = total()
+    return info
+
+
+def paginate(query, pagination: dict, columns: tuple, descending: bool = False, total=None):
+    """Order query by stable sort key and return page items with pagination info.
+
+    If pagination contains cursor, page is selected by seeking past the
+    cursor sort key, otherwise limit/offset is used. In both modes
+    'next_cursor' points to the next page or is None on the last one.
+    Total is only computed when pagination asks for it, by cached count
+    of query unless cheaper 'total' function is given.
+    """
+    total = total or cached_total(query)
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    limit = pagination["limit"]
+    cursor = pagination.get("cursor")
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        bound = tuple_(*[literal(v, c.type) for c, v in zip(columns, values)])
+        query = query.filter(key < bound if descending else key > bound)
+    else:
+        query = query.offset(pagination["offset"])
+    items = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([getattr(items[-1], c.key) for c in columns])
+    return items, page_info(pagination, next_cursor, total)
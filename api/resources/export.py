@@ -0,0 +1,94 @@
+import click
+from apiflask import abort, APIBlueprint
+from flask import current_app, Response, stream_with_context
+
+from .. import schemas
+from ..auth import token_auth
+from ..loading import eager_load
+from ..models import Post, User
+
+export = APIBlueprint("export", __name__, cli_group="export")
+post_schema = schemas.PostOutSchema()
+user_schema = schemas.UserSchema()
+
+
+def ndjson(query, schema, batch_size: int):
+    """Yield query results dumped with schema as newline delimited JSON.
+
+    Rows are fetched 'batch_size' at a time from server side cursor and
+    every batch is yielded as one chunk, so memory use does not grow with
+    table size.
+    """
+    dumps = current_app.json.dumps
+    batch = []
+    for obj in query.yield_per(batch_size):
+        batch.append(dumps(schema.dump(obj), separators=(",", ":")))
+        if len(batch) == batch_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def select_posts(user_id: int = None):
+    """Return query of posts to export, optionally of one user."""
+    query = eager_load(Post.query, post_schema)
+    if user_id is not None:
+        query = query.filter(Post.author_id == user_id)
+    return query.order_by(Post.post_id)
+
+
+def select_users():
+    """Return query of users to export."""
+    return User.query.order_by(User.user_id)
+
+
+def ndjson_response(query, schema) -> Response:
+    """Stream query results as newline delimited JSON response."""
+    rows = ndjson(query, schema, current_app.config["EXPORT_BATCH_SIZE"])
+    return Response(stream_with_context(rows), mimetype="application/x-ndjson")
+
+
+@export.get("/export/posts")
+@export.auth_required(token_auth)
+@export.doc(summary="Export all posts.", description="Stream all posts as newline delimited JSON.")
+def posts():
+    """Export all posts."""
+    return ndjson_response(select_posts(), post_schema)
+
+
+@export.get("/export/users/<int:user_id>/posts")
+@export.auth_required(token_auth)
+@export.doc(summary="Export all user posts.", description="Stream all user posts as newline delimited JSON.")
+def user_posts(user_id: int):
+    """Export all user posts."""
+    if User.query.filter_by(user_id=user_id).first() is None:
+        abort(404, "User not found")
+    return ndjson_response(select_posts(user_id), post_schema)
+
+
+@export.get("/export/users")
+@export.auth_required(token_auth)
+@export.doc(summary="Export all users.", description="Stream all users as newline delimited JSON.")
+def users():
+    """Export all users."""
+    return ndjson_response(select_users(), user_schema)
+
+
+@export.cli.command("posts")
+@click.option("--user-id", type=int, help="Export posts of this user only.")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows fetched at once.")
+@click.option("--output", type=click.File("w"), default="-", help="Output file, stdout by default.")
+def export_posts(user_id: int, batch_size: int, output):
+    """Export posts as newline delimited JSON."""
+    for chunk in ndjson(select_posts(user_id), post_schema, batch_size):
+        output.write(chunk)
+
+
+@export.cli.command("users")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows fetched at once.")
+@click.option("--output", type=click.File("w"), default="-", help="Output file, stdout by default.")
+def export_users(batch_size: int, output):
+    """Export users as newline delimited JSON."""
+    for chunk in ndjson(select_users(), user_schema, batch_size):
+        output.write(chunk)
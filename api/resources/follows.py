@@ -1,9 +1,12 @@
 from apiflask import abort, APIBlueprint
 
-from .. import schemas
+from .. import schemas, timeline
 from ..auth import token_auth
+from ..cache import cached, invalidate
+from ..fieldsets import sparse
 from ..models import db, User
-from .users import paginated_users
+from ..pagination import counter_total
+from .users import paginated_users, user_page_schema
 
 follows = APIBlueprint("follows", __name__)
 
@@ -13,11 +16,12 @@ follows = APIBlueprint("follows", __name__)
 @follows.input(schemas.PaginationQuerySchema, location="query")
 @follows.output(schemas.UserPaginationSchema)
 @follows.doc(summary="Retrieve users the autheticated user is following.", description="Retrieve users the autheticated user is following.")
+@sparse(user_page_schema, "users")
 @paginated_users
 def my_followed():
     """Retrieve users the autheticated user is following."""
     user = token_auth.current_user
-    return user.select_following()
+    return user.select_following(), counter_total(user.following_count)
 
 
 @follows.get("/me/followers")
@@ -25,11 +29,27 @@ def my_followed():
 @follows.input(schemas.PaginationQuerySchema, location="query")
 @follows.output(schemas.UserPaginationSchema)
 @follows.doc(summary="Retrieve autheticated user is followers.", description="Retrieve autheticated user is followers.")
+@sparse(user_page_schema, "users")
 @paginated_users
 def my_followers():
     """Retrieve autheticated user is followers."""
     user = token_auth.current_user
-    return user.select_followers()
+    return user.select_followers(), counter_total(user.followers_count)
+
+
+@follows.get("/me/following/status")
+@follows.auth_required(token_auth)
+@follows.input(schemas.FollowStatusQuerySchema, location="query")
+@follows.output(schemas.FollowStatusListSchema)
+@follows.doc(summary="Check relationship with many users.", description="Check if authenticated user follows and is followed by each of given users.")
+def following_status(data: dict):
+    """Check relationship with many users."""
+    me = token_auth.current_user
+    status = me.follow_status(data["ids"])
+    return {"users": [
+        {"user_id": user_id, "following": following, "followed_by": followed_by}
+        for user_id, (following, followed_by) in status.items()
+    ]}
 
 
 @follows.get("/me/following/<int:user_id>")
@@ -55,10 +75,11 @@ def follow(user_id: int):
     user = User.query.filter_by(user_id=user_id).first()
     if user is None:
         abort(404)
-    if me.is_following(user):
+    if not me.follow(user):
         abort(409, "You already follow this user.")
-    me.follow(user)
+    timeline.backfill(me, user)
     db.session.commit()
+    invalidate("users", "posts")
     return {}
 
 
@@ -72,34 +93,83 @@ def unfollow(user_id: int):
     user = User.query.filter_by(user_id=user_id).first()
     if user is None:
         abort(404)
-    if not me.is_following(user):
+    if not me.unfollow(user):
         abort(409, "You don't follow this user")
-    me.unfollow(user)
+    timeline.remove(me, [user.user_id])
     db.session.commit()
+    invalidate("users", "posts")
     return {}
 
 
+@follows.post("/me/following")
+@follows.auth_required(token_auth)
+@follows.input(schemas.FollowManySchema)
+@follows.output(schemas.FollowResultListSchema)
+@follows.doc(summary="Follow many users.", description="Follow many users at once, reporting result for each of them.")
+def follow_many(data: dict):
+    """Follow many users."""
+    me = token_auth.current_user
+    user_ids = list(dict.fromkeys(data["user_ids"]))
+    users = User.query.filter(User.user_id.in_(user_ids)).all()
+    new = me.follow_many(users)
+    for user in new:
+        timeline.backfill(me, user)
+    db.session.commit()
+    invalidate("users", "posts")
+
+    found = {user.user_id for user in users}
+    followed = {user.user_id for user in new}
+    return {"results": [
+        {"user_id": user_id, "status": "followed" if user_id in followed else
+            "already_following" if user_id in found else "not_found"}
+        for user_id in user_ids
+    ]}
+
+
+@follows.delete("/me/following")
+@follows.auth_required(token_auth)
+@follows.input(schemas.FollowManySchema)
+@follows.output(schemas.FollowResultListSchema)
+@follows.doc(summary="Unfollow many users.", description="Unfollow many users at once, reporting result for each of them.")
+def unfollow_many(data: dict):
+    """Unfollow many users."""
+    me = token_auth.current_user
+    user_ids = list(dict.fromkeys(data["user_ids"]))
+    unfollowed = set(me.unfollow_many(user_ids))
+    timeline.remove(me, list(unfollowed))
+    db.session.commit()
+    invalidate("users", "posts")
+    return {"results": [
+        {"user_id": user_id, "status": "unfollowed" if user_id in unfollowed else "not_following"}
+        for user_id in user_ids
+    ]}
+
+
 @follows.get("/users/<int:user_id>/following")
+@cached("users")
 @follows.input(schemas.PaginationQuerySchema, location="query")
 @follows.output(schemas.UserPaginationSchema)
 @follows.doc(summary="Retrieve the users this user is following.", description="Retrieve the users this user is following")
+@sparse(user_page_schema, "users")
 @paginated_users
 def followed(user_id: int):
     """Retrieve the users this user is following."""
     user = User.query.filter_by(user_id=user_id).first()
     if user is None:
         abort(404, "User not found")
-    return user.select_following() 
+    return user.select_following(), counter_total(user.following_count) 
 
 
 @follows.get("/users/<int:user_id>/followers")
+@cached("users")
 @follows.input(schemas.PaginationQuerySchema, location="query")
 @follows.output(schemas.UserPaginationSchema)
 @follows.doc(summary="Retrieve user followers.", description="Retrieve user followers.")
+@sparse(user_page_schema, "users")
 @paginated_users
 def followers(user_id: int):
     """Retrieve user followers."""
     user = User.query.filter_by(user_id=user_id).first()
     if user is None:
         abort(404, "User not found")
-    return user.select_followers()
+    return user.select_followers(), counter_total(user.followers_count)
@@ -1,26 +1,62 @@
 from functools import wraps
 
+import click
 from apiflask import abort, APIBlueprint
+from flask import current_app
+from sqlalchemy import select
 
-from .. import schemas
+from .. import schemas, timeline
 from ..auth import token_auth
+from ..cache import cached, invalidate
+from ..conditional import conditional
+from ..fieldsets import restrict, sparse
+from ..loading import eager_load, eager_options
 from ..models import db, Post, User
+from ..pagination import counter_total, paginate, table_total
+from ..search import search_posts
 
-posts = APIBlueprint("posts", __name__)
+posts = APIBlueprint("posts", __name__, cli_group="posts")
+post_schema = schemas.PostOutSchema()
+post_page_schema = schemas.PostPaginationSchema()
+
+
+def requested_post_schema():
+    """Return post schema restricted to fields asked for with ?fields= or ?view=."""
+    return restrict(post_schema, views=schemas.POST_VIEWS)
+
+
+def paginate_posts(query, pagination: dict, total=None, schema=post_schema) -> dict:
+    """Return paginated posts response for posts query, loading what schema dumps."""
+    query = eager_load(query, schema, keep=(Post.created_at,))
+    posts, pagination = paginate(query, pagination,
+                                 (Post.created_at, Post.post_id), descending=True, total=total)
+    return {"posts": posts, "pagination": pagination}
 
 
 def paginated_posts(f):
-    """If you decorate view with this, it will return paginated posts response."""
+    """If you decorate view with this, it will return paginated posts response.
+
+    View returns posts query, or (query, total) to provide cheaper total.
+    """
     @wraps(f)
     def wrapper(*args, **kwargs):
         args = list(args)
         pagination = args.pop(-1)
         res = f(*args, **kwargs)
-        posts = res.limit(pagination["limit"]).offset(pagination["offset"]).all()
-        return {"posts": posts, "pagination": pagination}
+        query, total = res if isinstance(res, tuple) else (res, None)
+        return paginate_posts(query, pagination, total, requested_post_schema())
     return wrapper
 
 
+def post_version(post_id: int):
+    """Return update times of post and its author."""
+    return db.session.execute(
+        select(Post.updated_at, User.updated_at)
+        .join(User, User.user_id == Post.author_id)
+        .where(Post.post_id == post_id)
+    ).first()
+
+
 @posts.post("/posts")
 @posts.auth_required(token_auth)
 @posts.input(schemas.PostSchema)
@@ -31,42 +67,102 @@ def new(data: dict):
     user = token_auth.current_user
     post = Post(author=user, **data)
     db.session.add(post)
+    db.session.flush()
+    User.adjust_count(User.posts_count, [user.user_id], 1)
+    timeline.fan_out(post)
     db.session.commit()
+    invalidate("posts", "users")
     return post 
 
 
+@posts.post("/posts/batch")
+@posts.auth_required(token_auth)
+@posts.input(schemas.PostSchema(many=True))
+@posts.output(schemas.PostBatchResultSchema, status_code=201)
+@posts.doc(summary="Create many posts.", description="Create many posts in one transaction, returning their ids in order.")
+def new_batch(data: list):
+    """Create many posts."""
+    max_size = current_app.config["POST_BATCH_MAX_SIZE"]
+    if not data:
+        abort(400, "No posts given")
+    if len(data) > max_size:
+        abort(400, f"At most {max_size} posts can be created at once")
+    user = token_auth.current_user
+    post_ids = Post.insert_many(user.user_id, data)
+    User.adjust_count(User.posts_count, [user.user_id], len(post_ids))
+    timeline.fan_out_many(user, post_ids)
+    db.session.commit()
+    invalidate("posts", "users")
+    return {"post_ids": post_ids}
+
+
 @posts.get("/posts")
+@cached("posts")
 @posts.input(schemas.PaginationQuerySchema, location="query")
 @posts.output(schemas.PostPaginationSchema)
 @posts.doc(summary="Retrieve all posts.", description="Retrieve all posts with pagination.")
+@sparse(post_page_schema, "posts", schemas.POST_VIEWS)
 @paginated_posts
 def all():
     """Retrieve all posts."""
-    return Post.query
+    return Post.query, table_total(Post)
+
+
+@posts.get("/posts/search")
+@cached("posts")
+@posts.input(schemas.SearchQuerySchema, location="query")
+@posts.output(schemas.PostPaginationSchema)
+@posts.doc(summary="Search posts.", description="Search posts by words in title and content, most relevant first.")
+@sparse(post_page_schema, "posts", schemas.POST_VIEWS)
+def search(query: dict):
+    """Search posts."""
+    pagination = {k: v for k, v in query.items() if k != "q"}
+    posts, pagination = search_posts(query["q"], pagination, eager_options(Post, requested_post_schema()))
+    return {"posts": posts, "pagination": pagination}
 
 
 @posts.get("/posts/<int:post_id>")
+@conditional(post_version)
 @posts.output(schemas.PostOutSchema)
 @posts.doc(summary="Retrieve post by id.", description="Retrieve post by id.")
+@sparse(post_schema, views=schemas.POST_VIEWS)
 def get(post_id: int):
     """Retrieve post by id."""
-    post = Post.query.filter_by(post_id=post_id).first()
+    post = eager_load(Post.query, requested_post_schema()).filter_by(post_id=post_id).first()
     if post is None:
         abort(404, "Post not found")
     return post
 
 
 @posts.get("/users/<int:user_id>/posts")
+@cached("posts")
 @posts.input(schemas.PaginationQuerySchema, location="query")
 @posts.output(schemas.PostPaginationSchema)
 @posts.doc(summary="Retrieve all user posts.", description="Retrieve all user posts with pagination.")
+@sparse(post_page_schema, "posts", schemas.POST_VIEWS)
 @paginated_posts
 def all_user_posts(user_id: int):
     """Retrieve all user posts."""
     user = User.query.filter_by(user_id=user_id).first()
     if user is None:
         abort(404, "User not found")
-    return user.posts
+    return user.posts, counter_total(user.posts_count)
+
+
+@posts.get("/me/feed")
+@posts.auth_required(token_auth)
+@posts.input(schemas.PaginationQuerySchema, location="query")
+@posts.output(schemas.PostPaginationSchema)
+@posts.doc(summary="Retrieve authenticated user feed.", description="Retrieve posts of users the authenticated user is following, newest first.")
+@sparse(post_page_schema, "posts", schemas.POST_VIEWS)
+def feed(pagination: dict):
+    """Retrieve authenticated user feed."""
+    user = token_auth.current_user
+    if timeline.enabled():
+        posts, pagination = timeline.paginate_timeline(
+            user, pagination, eager_options(Post, requested_post_schema()))
+        return {"posts": posts, "pagination": pagination}
+    return paginate_posts(user.select_feed(), pagination, schema=requested_post_schema())
 
 
 @posts.put("/posts/<int:post_id>")
@@ -76,13 +172,14 @@ def all_user_posts(user_id: int):
 @posts.doc(summary="Update post.", description="Update post.")
 def put(post_id: int, data: dict):
     """Update post."""
-    post = Post.query.filter_by(post_id=post_id).first()
+    post = eager_load(Post.query, post_schema).filter_by(post_id=post_id).first()
     if post is None:
         abort(404, "Post not found")
     if post.author != token_auth.current_user:
         abort(403, "This is not your post")
     post.update(data)
     db.session.commit()
+    invalidate("posts")
     return post
 
 
@@ -97,6 +194,18 @@ def delete(post_id: int):
         abort(404, "Post not found")
     if post.author != token_auth.current_user:
         abort(403, "This is not your post")
+    timeline.retract(post)
+    User.adjust_count(User.posts_count, [post.author_id], -1)
     db.session.delete(post)
     db.session.commit()
+    invalidate("posts", "users")
     return {}
+
+
+@posts.cli.command("excerpts")
+@click.option("--batch-size", default=1000, show_default=True, help="Posts updated per transaction.")
+@click.option("--all", "refresh", is_flag=True, help="Recompute excerpts of all posts, not only missing ones.")
+def excerpts(batch_size: int, refresh: bool):
+    """Compute excerpts of posts."""
+    updated = Post.fill_excerpts(batch_size, refresh)
+    click.echo(f"Updated excerpts of {updated} posts.")
@@ -1,3 +1,6 @@
+import time
+
+import click
 from apiflask import abort, APIBlueprint
 from flask import current_app, url_for, request
 from werkzeug.http import dump_cookie
@@ -6,7 +9,7 @@ from ..auth import basic_auth
 from .. import schemas
 from ..models import db, Token, User
 
-tokens = APIBlueprint("tokens", __name__)
+tokens = APIBlueprint("tokens", __name__, cli_group="tokens")
 
 
 def token_response(token: Token) -> dict:
@@ -36,7 +39,6 @@ def new():
     """Create new access token."""
     user = basic_auth.current_user
     token = user.generate_access_token()
-    Token.clean()
     db.session.commit()
     return token_response(token) 
 
@@ -74,3 +76,15 @@ def revoke(data: dict):
     token.expire()
     db.session.commit()
     return {}
+
+
+@tokens.cli.command("purge")
+@click.option("--batch-size", default=None, type=int, help="Rows deleted per transaction.")
+@click.option("--pause", default=None, type=float, help="Seconds to sleep between batches.")
+def purge(batch_size: int, pause: float):
+    """Remove expired tokens in batches."""
+    batch_size = batch_size or current_app.config["TOKEN_PURGE_BATCH_SIZE"]
+    pause = current_app.config["TOKEN_PURGE_PAUSE"] if pause is None else pause
+    start = time.perf_counter()
+    removed = Token.purge(batch_size, pause)
+    click.echo(f"Removed {removed} expired tokens in {time.perf_counter() - start:.2f}s.")
@@ -1,22 +1,52 @@
+import os
+import time
 from functools import wraps
 
+import click
 from apiflask import abort, APIBlueprint
+from flask import current_app
+from sqlalchemy import select
 
 from .. import schemas
 from ..auth import token_auth
+from ..cache import cached, invalidate
+from ..conditional import conditional
+from ..fieldsets import restrict, sparse
+from ..loading import eager_load
 from ..models import db, User
+from ..pagination import paginate, table_total
+from ..search import search_users
+from ..user_import import read_records, UserImport
 
-users = APIBlueprint("users", __name__)
+users = APIBlueprint("users", __name__, cli_group="users")
+user_schema = schemas.UserSchema()
+user_page_schema = schemas.UserPaginationSchema()
+user_list_schema = schemas.UserListSchema()
+
+
+def user_version(user_id: int):
+    """Return update time of user."""
+    return db.session.execute(select(User.updated_at).where(User.user_id == user_id)).first()
+
+
+def username_version(username: str):
+    """Return update time of user by username."""
+    return db.session.execute(select(User.updated_at).where(User.username == username)).first()
 
 
 def paginated_users(f):
-    """If you decorate view with this, it will return paginated users response."""
+    """If you decorate view with this, it will return paginated users response.
+
+    View returns users query, or (query, total) to provide cheaper total.
+    """
     @wraps(f)
     def wrapper(*args, **kwargs):
         args = list(args)
         pagination = args.pop(-1)
         res = f(*args, **kwargs)
-        users = res.limit(pagination["limit"]).offset(pagination["offset"]).all()
+        query, total = res if isinstance(res, tuple) else (res, None)
+        users, pagination = paginate(eager_load(query, restrict(user_schema)), pagination,
+                                     (User.user_id,), total=total)
         return {"users": users, "pagination": pagination}
     return wrapper
 
@@ -30,22 +60,43 @@ def new(data: dict):
     user = User(**data)
     db.session.add(user)
     db.session.commit()
+    invalidate("users")
+    index = current_app.extensions["username_index"]
+    if index is not None:
+        index.add(user.username_lower, user.user_id)
     return user
 
 
 @users.get("/users")
+@cached("users")
 @users.input(schemas.PaginationQuerySchema, location="query")
 @users.output(schemas.UserPaginationSchema)
 @users.doc(summary="Retrieve all users.", description="Retrieve all users with pagination.")
+@sparse(user_page_schema, "users")
 @paginated_users
 def all():
     """Retrieve all users."""
-    return User.query
+    return User.query, table_total(User)
+
+
+@users.get("/users/search")
+@cached("users")
+@users.input(schemas.UserSearchQuerySchema, location="query")
+@users.output(schemas.UserListSchema)
+@users.doc(summary="Search users by username prefix.",
+           description="Retrieve users whose username starts with prefix, ignoring case, "
+                       "exact match first and then by followers count.")
+@sparse(user_list_schema, "users")
+def search(query: dict):
+    """Search users by username prefix."""
+    return {"users": search_users(query["prefix"], query["limit"])}
 
 
 @users.get("/users/<int:user_id>")
+@conditional(user_version)
 @users.output(schemas.UserSchema)
 @users.doc(summary="Retrieve user by id.", description="Retrieve user by id.")
+@sparse(user_schema)
 def get(user_id: int):
     """Retrieve user by id."""
     user = User.query.filter_by(user_id=user_id).first()
@@ -55,8 +106,10 @@ def get(user_id: int):
 
 
 @users.get("/users/<username>")
+@conditional(username_version)
 @users.output(schemas.UserSchema)
 @users.doc(summary="Retrieve user by username.", description="Retrieve user by username.")
+@sparse(user_schema)
 def get_by_username(username: str):
     """Retrieve user by username."""
     user = User.query.filter_by(username=username).first()
@@ -69,6 +122,7 @@ def get_by_username(username: str):
 @users.auth_required(token_auth)
 @users.output(schemas.UserSchema)
 @users.doc(summary="Retrieve authenticated user.", description="Retrieve authenticated user.")
+@sparse(user_schema)
 def me():
     """Retrieve authenticated user."""
     return token_auth.current_user
@@ -85,6 +139,42 @@ def put(data: dict):
     if "password" in data and ("old_password" not in data or
                                 not user.verify_password(data["old_password"])):
         abort(403)
+    username = user.username_lower
     user.update(data)
     db.session.commit()
+    invalidate("users", "posts")
+    index = current_app.extensions["username_index"]
+    if index is not None and user.username_lower != username:
+        index.remove(username, user.user_id)
+        index.add(user.username_lower, user.user_id)
     return user
+
+
+@users.cli.command("import")
+@click.argument("file", type=click.File("r"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]),
+              help="File format, guessed from extension by default.")
+@click.option("--chunk-size", default=1000, show_default=True, help="Users inserted per transaction.")
+@click.option("--workers", default=os.cpu_count(), show_default=True,
+              help="Password hashing processes, 0 hashes in this process.")
+def import_users(file, fmt: str, chunk_size: int, workers: int):
+    """Import users from CSV or NDJSON file with username, email, password and about_me."""
+    fmt = fmt or ("csv" if file.name.endswith(".csv") else "ndjson")
+    start = time.perf_counter()
+    importer = UserImport(current_app.config["PASSWORD_HASH_METHOD"], workers, chunk_size)
+    importer.run(read_records(file, fmt))
+    invalidate("users")
+    elapsed = time.perf_counter() - start
+
+    for line, error in importer.errors:
+        click.echo(f"Record {line}: {error}", err=True)
+    click.echo(f"Imported {importer.imported} users, rejected {len(importer.errors)} "
+               f"in {elapsed:.2f}s ({importer.imported / elapsed:.1f} users/s).")
+
+
+@users.cli.command("recount")
+@click.option("--batch-size", default=1000, show_default=True, help="Users updated per transaction.")
+def recount(batch_size: int):
+    """Recompute follower, following and post counters of all users."""
+    updated = User.recount(batch_size)
+    click.echo(f"Recounted {updated} users.")
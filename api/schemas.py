@@ -1,20 +1,33 @@
-from apiflask import fields, Schema
-from marshmallow import validates, ValidationError
-from marshmallow.validate import Length
+from apiflask import fields
+from marshmallow import EXCLUDE, validates, ValidationError
+from marshmallow.validate import Length, Range
 
 from .auth import token_auth
 from .models import User
+from .serialization import CompiledSchema
 
+# Usernames shadowed by static routes under /users
+RESERVED_USERNAMES = {"search"}
 
-class UserSchema(Schema):
+
+def not_reserved(value: str):
+    """Validate username for not being reserved."""
+    if value.lower() in RESERVED_USERNAMES:
+        raise ValidationError("Username is reserved")
+
+
+class UserSchema(CompiledSchema):
     """Marshmallow schema to represent 'user'."""
     user_id = fields.Integer(dump_only=True)
-    username = fields.String(required=True, validate=Length(min=3, max=64))
+    username = fields.String(required=True, validate=[Length(min=3, max=64), not_reserved])
     email = fields.Email(required=True, load_only=True)
     password = fields.String(required=True, load_only=True)
     about_me = fields.String(validate=Length(max=256))
     last_seen = fields.DateTime(dump_only=True)
     member_since = fields.DateTime(dump_only=True)
+    followers_count = fields.Integer(dump_only=True)
+    following_count = fields.Integer(dump_only=True)
+    posts_count = fields.Integer(dump_only=True)
 
     @validates("username")
     def validate_username(self, value: str):
@@ -36,13 +49,24 @@ class UpdateUserSchema(UserSchema):
     old_password = fields.String(load_only=True)
 
 
-class TokenSchema(Schema):
+class UserImportSchema(CompiledSchema):
+    """Marshmallow schema to represent imported 'user', checked for uniqueness in bulk."""
+    class Meta:
+        unknown = EXCLUDE
+
+    username = fields.String(required=True, validate=[Length(min=3, max=64), not_reserved])
+    email = fields.Email(required=True)
+    password = fields.String(required=True)
+    about_me = fields.String(validate=Length(max=256))
+
+
+class TokenSchema(CompiledSchema):
     """Marshmallow schema to represent 'token'."""
     access_token = fields.String(required=True, validate=Length(max=64))
     refresh_token = fields.String(validate=Length(max=64))
 
 
-class PostSchema(Schema):
+class PostSchema(CompiledSchema):
     """Marshmallow schema to represent 'post'."""
     post_id = fields.Integer(dump_only=True)
     title = fields.String(required=True, validate=Length(max=50))
@@ -52,18 +76,83 @@ class PostSchema(Schema):
 
 class PostOutSchema(PostSchema):
     """Marshmallow schema to represent 'post' output."""
+    excerpt = fields.String()
     author = fields.Nested(UserSchema)
 
 
-class PaginationQuerySchema(Schema):
+# Named field sets of 'post' output selected with ?view=
+POST_VIEWS = {
+    "summary": ("post_id", "title", "excerpt", "created_at", "author.user_id", "author.username"),
+}
+
+
+class PostBatchResultSchema(CompiledSchema):
+    """Marshmallow schema to represent batch post creation result."""
+    post_ids = fields.List(fields.Integer())
+
+
+class FollowStatusQuerySchema(CompiledSchema):
+    """Marshmallow schema to represent follow status request in query."""
+    ids = fields.DelimitedList(fields.Integer(), required=True, validate=Length(min=1, max=100))
+
+
+class FollowStatusSchema(CompiledSchema):
+    """Marshmallow schema to represent follow status of 'user'."""
+    user_id = fields.Integer()
+    following = fields.Boolean()
+    followed_by = fields.Boolean()
+
+
+class FollowStatusListSchema(CompiledSchema):
+    """Marshmallow schema to represent follow status of many 'user'."""
+    users = fields.List(fields.Nested(FollowStatusSchema))
+
+
+class FollowManySchema(CompiledSchema):
+    """Marshmallow schema to represent bulk follow request."""
+    user_ids = fields.List(fields.Integer(), required=True, validate=Length(min=1, max=100))
+
+
+class FollowResultSchema(CompiledSchema):
+    """Marshmallow schema to represent bulk follow result of 'user'."""
+    user_id = fields.Integer()
+    status = fields.String()
+
+
+class FollowResultListSchema(CompiledSchema):
+    """Marshmallow schema to represent bulk follow results."""
+    results = fields.List(fields.Nested(FollowResultSchema))
+
+
+class PaginationQuerySchema(CompiledSchema):
     """Marshmallow schema to represent 'pagination' in query."""
-    limit = fields.Integer(load_default=10)
-    offset = fields.Integer(load_default=0)
+    limit = fields.Integer(load_default=10, validate=Range(min=1))
+    offset = fields.Integer(load_default=0, validate=Range(min=0))
+    cursor = fields.String()
+    with_total = fields.Boolean(load_default=False)
+
 
+class SearchQuerySchema(PaginationQuerySchema):
+    """Marshmallow schema to represent search request in query."""
+    q = fields.String(required=True, validate=Length(min=1, max=256))
 
-class PaginationSchema(Schema):
+
+class UserSearchQuerySchema(CompiledSchema):
+    """Marshmallow schema to represent username prefix search in query."""
+    prefix = fields.String(required=True, validate=Length(min=1, max=64))
+    limit = fields.Integer(load_default=10, validate=Range(min=1, max=20))
+
+
+class PaginationOutSchema(PaginationQuerySchema):
+    """Marshmallow schema to represent 'pagination' in response."""
+    next_cursor = fields.String(allow_none=True)
+    total = fields.Integer()
+    total_exact = fields.Boolean()
+
+
+class PaginationSchema(CompiledSchema):
     """Marshmallow schema to represent 'pagination'."""
-    pagination = fields.Nested(PaginationQuerySchema)
+    pagination = fields.Nested(PaginationOutSchema)
 
 
 class UserPaginationSchema(PaginationSchema):
@@ -71,6 +160,11 @@ class UserPaginationSchema(PaginationSchema):
     users = fields.List(fields.Nested(UserSchema))
 
 
+class UserListSchema(CompiledSchema):
+    """Marshmallow schema to represent list of 'user'."""
+    users = fields.List(fields.Nested(UserSchema))
+
+
 class PostPaginationSchema(PaginationSchema):
     """Marshmallow schema to represent paginated 'post'."""
     posts = fields.List(fields.Nested(PostOutSchema))
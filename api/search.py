@@ -0,0 +1,88 @@
+import re
+
+from apiflask import abort
+from flask import current_app
+from sqlalchemy import column, Float, func, Integer, literal_column, select, table
+
+from .models import db, Post, POST_SEARCH_VECTOR, User
+from .pagination import counter_total, page_info, paginate
+
+posts_fts = table("posts_fts", column("rowid", Integer))
+
+
+def match_query(q: str) -> str:
+    """Turn free text into FTS5 query matching all of its words."""
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def select_matches(q: str):
+    """Return query of (post_id, score) of posts matching q, lower score ranks higher."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        # bm25() weighs title matches ten times as much as content ones
+        score = func.bm25(literal_column("posts_fts"), 10.0, 1.0, type_=Float).label("score")
+        return db.session.query(Post.post_id, score) \
+            .select_from(posts_fts) \
+            .join(Post, Post.post_id == posts_fts.c.rowid) \
+            .filter(literal_column("posts_fts").op("MATCH")(match_query(q)))
+    if dialect == "postgresql":
+        vector = literal_column(f"({POST_SEARCH_VECTOR})")
+        query = func.plainto_tsquery("english", q)
+        score = (-func.ts_rank_cd(vector, query, type_=Float)).label("score")
+        return db.session.query(Post.post_id, score).filter(vector.op("@@")(query))
+    abort(501, "Search is not supported by this database")
+
+
+def search_posts(q: str, pagination: dict, options: list):
+    """Return page of posts matching q, most relevant first, with pagination info."""
+    if not re.search(r"\w", q):
+        return [], page_info(pagination, None, counter_total(0))
+    query = select_matches(q)
+    score, post_id = query.column_descriptions[1]["expr"], Post.post_id
+    rows, pagination = paginate(query, pagination, (score, post_id))
+
+    ids = [row.post_id for row in rows]
+    posts = {post.post_id: post for post in
+             Post.query.options(*options).filter(Post.post_id.in_(ids))}
+    return [posts[post_id] for post_id in ids if post_id in posts], pagination
+
+
+def prefix_end(prefix: str):
+    """Return smallest string greater than all strings starting with prefix, None if unbounded."""
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def load_username_index() -> int:
+    """Reload in-memory username index from database, return number of users."""
+    index = current_app.extensions["username_index"]
+    index.load(db.session.execute(select(User.username_lower, User.user_id)))
+    return len(index)
+
+
+def search_users(prefix: str, limit: int) -> list:
+    """Return up to 'limit' users whose username starts with prefix, ignoring case.
+
+    First USERNAME_SEARCH_CANDIDATES matches in username order are found
+    with range seek on lowercased username index, or in memory when
+    USERNAME_INDEX is enabled and loaded, then ranked exact match first
+    and by followers count.
+    """
+    prefix = prefix.lower()
+    candidates = current_app.config["USERNAME_SEARCH_CANDIDATES"]
+    index = current_app.extensions["username_index"]
+    if index is not None and index.loaded:
+        ids = index.search(prefix, candidates)
+        users = User.query.filter(User.user_id.in_(ids)).all() if ids else []
+        # Index may lag behind renames made by other workers.
+        users = [user for user in users if user.username_lower.startswith(prefix)]
+    else:
+        query = User.query.filter(User.username_lower >= prefix)
+        end = prefix_end(prefix)
+        if end is not None:
+            query = query.filter(User.username_lower < end)
+        users = query.order_by(User.username_lower).limit(candidates).all()
+    users.sort(key=lambda user: (user.username_lower != prefix, -user.followers_count, user.username_lower))
+    return users[:limit]
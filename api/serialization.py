@@ -0,0 +1,127 @@
+from apiflask import fields, Schema
+from flask import current_app, has_app_context
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from marshmallow.utils import ensure_text_type, get_value
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _getter(attr: str):
+    """Return function reading attr from object the way marshmallow accessor does."""
+    def get(obj):
+        if isinstance(obj, dict):
+            return obj[attr] if attr in obj else getattr(obj, attr, missing)
+        if hasattr(obj, "__getitem__"):
+            return get_value(obj, attr, missing)
+        return getattr(obj, attr, missing)
+    return get
+
+
+def _converter(field):
+    """Return function formatting value of field, or None if it has no fast path."""
+    cls = type(field)
+    if cls is fields.Integer and not field.as_string:
+        return lambda value: None if value is None else int(value)
+    if cls is fields.String:
+        return lambda value: None if value is None else ensure_text_type(value)
+    if cls is fields.DateTime and (field.format or field.DEFAULT_FORMAT) in field.SERIALIZATION_FUNCS:
+        func = field.SERIALIZATION_FUNCS[field.format or field.DEFAULT_FORMAT]
+        return lambda value: None if value is None else func(value)
+    if cls is fields.Nested:
+        many = field.schema.many or field.many
+        dump = compiled_dumper(field.schema)
+        if many:
+            return lambda value: None if value is None else [dump(item) for item in value]
+        return lambda value: None if value is None else dump(value)
+    if cls is fields.List:
+        inner = _converter(field.inner)
+        if inner is None:
+            return None
+        return lambda value: None if value is None else [inner(item) for item in value]
+    return None
+
+
+def compile_dumper(schema: Schema):
+    """Build function dumping single object exactly like schema.dump() does.
+
+    Known field types are formatted by plain closures. Other fields, and
+    schemas with dump hooks, go through marshmallow as usual.
+    """
+    if schema._has_processors(PRE_DUMP) or schema._has_processors(POST_DUMP):
+        return lambda obj: Schema.dump(schema, obj, many=False)
+
+    plan = []
+    for name, field in schema.dump_fields.items():
+        key = field.data_key if field.data_key is not None else name
+        attr = field.attribute or name
+        convert = _converter(field)
+        if convert is None or "." in attr or field.dump_default is not missing \
+                or not field._CHECK_ATTRIBUTE:
+            plan.append((key, None, lambda obj, name=name, field=field: field.serialize(
+                name, obj, accessor=schema.get_attribute)))
+        else:
+            plan.append((key, _getter(attr), convert))
+
+    def dump(obj):
+        result = {}
+        for key, get, convert in plan:
+            value = convert(obj) if get is None else get(obj)
+            if value is missing:
+                continue
+            result[key] = value if get is None else convert(value)
+        return result
+    return dump
+
+
+def compiled_dumper(schema: Schema):
+    """Return cached compiled dumper of schema instance."""
+    dumper = schema.__dict__.get("_compiled_dumper")
+    if dumper is None:
+        dumper = schema._compiled_dumper = compile_dumper(schema)
+    return dumper
+
+
+class CompiledSchema(Schema):
+    """Schema dumping through compiled dumper when SCHEMA_COMPILED_DUMP is set."""
+
+    def dump(self, obj, *, many: bool = None):
+        if not has_app_context() or not current_app.config["SCHEMA_COMPILED_DUMP"]:
+            return super().dump(obj, many=many)
+        many = self.many if many is None else bool(many)
+        dump = compiled_dumper(self)
+        if many:
+            return [dump(item) for item in obj]
+        return dump(obj)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider encoding compact responses with orjson.
+
+    Output is identical to default provider: anything orjson would write
+    differently, like non-ASCII text or objects handled by 'default', is
+    either passed through to it or encoded by default provider instead.
+    Floats are not guarded, the API does not return any.
+    """
+    options = (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME |
+               orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Deprecated Flask 2.2 settings, gone in Flask 2.3
+        config = self._app.config
+        legacy = (config.get("JSON_SORT_KEYS"), config.get("JSON_AS_ASCII"),
+                  getattr(self._app, "_json_encoder", None))
+        if kwargs != {"separators": (",", ":")} or legacy != (None, None, None) \
+                or not self.sort_keys or not self.ensure_ascii:
+            return super().dumps(obj, **kwargs)
+        try:
+            data = orjson.dumps(obj, default=self.default, option=self.options)
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+        if not data.isascii() or b"\x7f" in data:
+            return super().dumps(obj, **kwargs)
+        return data.decode()
@@ -0,0 +1,68 @@
+import calendar
+import secrets
+import threading
+from datetime import datetime
+
+from itsdangerous import BadSignature, Signer
+
+
+def _signer(secret_key: str) -> Signer:
+    return Signer(secret_key, salt="access-token")
+
+
+def sign_access_token(secret_key: str, user_id: int, expiration: datetime) -> str:
+    """Create access token carrying user id and expiration signed with secret key."""
+    timestamp = calendar.timegm(expiration.utctimetuple())
+    payload = f"{user_id}.{timestamp}.{secrets.token_urlsafe(6)}"
+    return _signer(secret_key).sign(payload).decode()
+
+
+def load_access_token(secret_key: str, access_token: str):
+    """Return (user_id, expiration) of signed access token or None if signature is invalid."""
+    try:
+        payload = _signer(secret_key).unsign(access_token).decode()
+        user_id, timestamp, _ = payload.split(".")
+        return int(user_id), datetime.utcfromtimestamp(int(timestamp))
+    except (BadSignature, ValueError):
+        return None
+
+
+def is_signed_access_token(access_token: str) -> bool:
+    """Tell signed access tokens from opaque ones, which never contain dots."""
+    return "." in access_token
+
+
+class RevocationList:
+    """Revoked access tokens kept only until their natural expiration.
+
+    Keys are token hashes. Expired entries are pruned lazily, at most
+    once per 'prune_every' additions.
+    """
+
+    def __init__(self, prune_every: int = 1000):
+        self.prune_every = prune_every
+        self._entries = {}
+        self._additions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def add(self, key: str, expiration: datetime, now: datetime):
+        """Revoke token key until expiration."""
+        if expiration <= now:
+            return
+        with self._lock:
+            self._entries[key] = max(expiration, self._entries.get(key, expiration))
+            self._additions += 1
+            if self._additions >= self.prune_every:
+                self._additions = 0
+                self._entries = {k: v for k, v in self._entries.items() if v > now}
+
+    def is_revoked(self, key: str, now: datetime) -> bool:
+        """Check if token key is revoked and not yet expired."""
+        expiration = self._entries.get(key)
+        return expiration is not None and expiration > now
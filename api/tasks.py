@@ -0,0 +1,41 @@
+import threading
+import time
+
+from apiflask import APIFlask
+
+
+class PeriodicTask(threading.Thread):
+    """Daemon thread calling function inside application context every interval seconds.
+
+    With immediate, function is also called right after start.
+    """
+
+    def __init__(self, app: APIFlask, interval: float, func, name: str = None, immediate: bool = False):
+        super().__init__(name=name or func.__name__, daemon=True)
+        self.app = app
+        self.interval = interval
+        self.func = func
+        self.immediate = immediate
+        self._stopped = threading.Event()
+
+    def run(self):
+        if self.immediate:
+            self.run_once()
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        """Call function once inside application context, logging its failure."""
+        with self.app.app_context():
+            start = time.perf_counter()
+            try:
+                result = self.func()
+            except Exception:
+                self.app.logger.exception("Periodic task %s failed.", self.name)
+                return
+            self.app.logger.info("Periodic task %s returned %s in %.2fs.",
+                                 self.name, result, time.perf_counter() - start)
+
+    def stop(self):
+        """Stop task after current run."""
+        self._stopped.set()
@@ -0,0 +1,111 @@
+from flask import current_app
+from sqlalchemy import insert, literal, select, tuple_
+
+from .models import db, followers, Post, TimelineEntry, User
+from .pagination import cached_total, decode_cursor, encode_cursor, page_info
+
+
+def enabled() -> bool:
+    """Check if timelines are materialized on write."""
+    return current_app.config["FEED_FANOUT_ON_WRITE"]
+
+
+def is_celebrity(author: User) -> bool:
+    """Check if author posts are merged into timelines on read instead of fanned out.
+
+    Once author reaches the follower threshold the flag stays set, so posts
+    written on either side of the threshold never go missing from timelines.
+    """
+    if not author.fanout_on_read and \
+            author.followers_count >= current_app.config["FEED_CELEBRITY_THRESHOLD"]:
+        author.fanout_on_read = True
+    return author.fanout_on_read
+
+
+def fan_out(post: Post):
+    """Add flushed post to timelines of its author followers."""
+    if not enabled() or is_celebrity(post.author):
+        return
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"],
+        select(followers.c.follower_id, literal(post.post_id), literal(post.author_id),
+               literal(post.created_at, db.DateTime))
+        .where(followers.c.followed_id == post.author_id)
+    ))
+
+
+def fan_out_many(author: User, post_ids: list):
+    """Add flushed posts of one author to timelines of author followers."""
+    if not enabled() or is_celebrity(author):
+        return
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"],
+        select(followers.c.follower_id, Post.post_id, Post.author_id, Post.created_at)
+        .join(Post, Post.author_id == followers.c.followed_id)
+        .where(Post.post_id.in_(post_ids))
+    ))
+
+
+def retract(post: Post):
+    """Remove post from all timelines."""
+    TimelineEntry.query.filter_by(post_id=post.post_id).delete(synchronize_session=False)
+
+
+def backfill(follower: User, followed: User):
+    """Add recent posts of newly followed user to follower timeline."""
+    if not enabled() or is_celebrity(followed):
+        return
+    recent = select(literal(follower.user_id), Post.post_id, Post.author_id, Post.created_at) \
+        .where(Post.author_id == followed.user_id) \
+        .order_by(Post.created_at.desc(), Post.post_id.desc()) \
+        .limit(current_app.config["FEED_BACKFILL_SIZE"])
+    db.session.execute(insert(TimelineEntry).from_select(
+        ["user_id", "post_id", "author_id", "created_at"], recent))
+
+
+def remove(follower: User, followed_ids: list):
+    """Remove posts of unfollowed users from follower timeline."""
+    TimelineEntry.query.filter(TimelineEntry.user_id == follower.user_id,
+                               TimelineEntry.author_id.in_(followed_ids)) \
+        .delete(synchronize_session=False)
+
+
+def paginate_timeline(user: User, pagination: dict, options: list):
+    """Return page of user timeline posts, newest first, with pagination info.
+
+    Materialized entries and posts of followed celebrities are read as two
+    index-backed queries bounded by page size and merged in memory.
+    """
+    limit = pagination["limit"]
+    cursor = pagination.get("cursor")
+    offset = 0 if cursor else pagination["offset"]
+    size = offset + limit + 1
+    values = decode_cursor(cursor, (Post.created_at, Post.post_id)) if cursor else None
+
+    entries = select(TimelineEntry.post_id, TimelineEntry.created_at) \
+        .where(TimelineEntry.user_id == user.user_id)
+    merged = select(Post.post_id, Post.created_at) \
+        .join(followers, followers.c.followed_id == Post.author_id) \
+        .join(User, User.user_id == Post.author_id) \
+        .where(followers.c.follower_id == user.user_id, User.fanout_on_read.is_(True))
+
+    rows = {}
+    for query, created_at, post_id in ((entries, TimelineEntry.created_at, TimelineEntry.post_id),
+                                       (merged, Post.created_at, Post.post_id)):
+        if values is not None:
+            query = query.where(tuple_(created_at, post_id) < tuple_(
+                literal(values[0], created_at.type), literal(values[1], post_id.type)))
+        query = query.order_by(created_at.desc(), post_id.desc()).limit(size)
+        rows.update(db.session.execute(query).all())
+    keys = sorted(rows.items(), key=lambda row: (row[1], row[0]), reverse=True)[offset:size]
+
+    ids = [post_id for post_id, _ in keys[:limit]]
+    posts = {post.post_id: post for post in
+             Post.query.options(*options).filter(Post.post_id.in_(ids))}
+    items = [posts[post_id] for post_id in ids if post_id in posts]
+
+    next_cursor = None
+    if len(keys) > limit:
+        post_id, created_at = keys[limit - 1]
+        next_cursor = encode_cursor([created_at, post_id])
+    return items, page_info(pagination, next_cursor, cached_total(user.select_feed()))
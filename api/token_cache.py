@@ -0,0 +1,161 @@
+import calendar
+import fcntl
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from .signed_tokens import RevocationList
+
+
+def token_key(access_token: str) -> str:
+    """Hash access token so raw tokens are never kept in cache or on disk."""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+class InvalidationLog:
+    """Append-only file shared by workers to announce revoked tokens.
+
+    Every line holds token key and its expiration. Workers remember how far
+    they have read and pick up new lines with one stat() call per lookup.
+    When file grows over 'max_bytes' it is replaced by one holding only
+    unexpired lines; readers noticing the new inode drop their caches and
+    read it from the start.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._inode = None
+        self._offset = 0
+
+    def publish(self, key: str, expiration: datetime):
+        """Announce revoked token key to all workers."""
+        # Round expiration up so revocation never ends before the token does.
+        line = f"{key} {calendar.timegm(expiration.utctimetuple()) + 1}\n"
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                self._compact()
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def _compact(self):
+        now = time.time()
+        with open(self.path) as f:
+            live = [line for line in f if line.endswith("\n") and int(line.split()[1]) > now]
+        tmp = f"{self.path}.{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.writelines(live)
+        os.replace(tmp, self.path)
+
+    def read(self):
+        """Return (reset, entries) published since last read.
+
+        'reset' tells that file was replaced and caches must be dropped.
+        Entries are (key, expiration) pairs.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False, []
+        reset = False
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            reset = self._inode is not None
+            self._inode, self._offset = stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return reset, []
+        with open(self.path) as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind("\n") + 1
+        self._offset += end
+        entries = []
+        for line in data[:end].splitlines():
+            key, timestamp = line.split()
+            entries.append((key, datetime.utcfromtimestamp(int(timestamp))))
+        return reset, entries
+
+
+class TokenCache:
+    """Bounded LRU cache of verified access tokens.
+
+    Maps access token to owner user id until token access expiration or
+    'ttl' seconds, whichever comes first. Also keeps revoked tokens, which
+    signed access tokens are checked against.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60, invalidation_file: str = None):
+        self.max_size = max_size
+        self.ttl = timedelta(seconds=ttl)
+        self.log = InvalidationLog(invalidation_file) if invalidation_file else None
+        self.revoked = RevocationList()
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return cache hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def get(self, access_token: str, now: datetime):
+        """Return cached user id of access token or None."""
+        if not self.max_size:
+            return None
+        self.sync()
+        key = token_key(access_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+
+    def set(self, access_token: str, user_id: int, expiration: datetime, now: datetime):
+        """Cache user id of access token."""
+        if not self.max_size:
+            return
+        key = token_key(access_token)
+        with self._lock:
+            self._entries[key] = (user_id, min(expiration, now + self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, access_token: str, expiration: datetime, now: datetime):
+        """Revoke access token in this worker and announce it to others."""
+        key = token_key(access_token)
+        with self._lock:
+            self._entries.pop(key, None)
+        if expiration <= now:
+            return
+        self.revoked.add(key, expiration, now)
+        if self.log is not None:
+            self.log.publish(key, expiration)
+
+    def is_revoked(self, access_token: str, now: datetime) -> bool:
+        """Check if access token was revoked before its expiration."""
+        self.sync()
+        return self.revoked.is_revoked(token_key(access_token), now)
+
+    def sync(self):
+        """Apply revocations published by other workers."""
+        if self.log is None:
+            return
+        now = datetime.utcnow()
+        with self._lock:
+            reset, entries = self.log.read()
+            if reset:
+                self._entries.clear()
+            for key, expiration in entries:
+                self._entries.pop(key, None)
+                self.revoked.add(key, expiration, now)
@@ -0,0 +1,104 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import islice
+
+from marshmallow import ValidationError
+from werkzeug.security import generate_password_hash
+
+from .models import db, User
+from .schemas import UserImportSchema
+
+
+def read_records(file, fmt: str):
+    """Yield (record, error) pairs from CSV file with header or NDJSON file."""
+    if fmt == "csv":
+        for record in csv.DictReader(file):
+            yield record, None
+        return
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line), None
+            except ValueError:
+                yield None, "Invalid JSON"
+
+
+class UserImport:
+    """Bulk import of users in chunks.
+
+    Every chunk is validated, checked for taken usernames and emails with
+    two IN queries, hashed across process pool and inserted with one
+    executemany INSERT in its own transaction.
+    """
+
+    def __init__(self, method: str, workers: int = 0, chunk_size: int = 1000):
+        self.hash = partial(generate_password_hash, method=method)
+        self.pool = ProcessPoolExecutor(workers) if workers else None
+        self.chunk_size = chunk_size
+        self.schema = UserImportSchema()
+        self.imported = 0
+        self.errors = []
+        self._usernames = set()
+        self._emails = set()
+
+    def run(self, records):
+        """Import (record, error) pairs, collecting (line, error) of rejected ones."""
+        records = enumerate(records, start=1)
+        try:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk)
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+            self.errors.sort(key=lambda error: error[0])
+
+    def _reject(self, line: int, error: str):
+        self.errors.append((line, error))
+
+    def _import_chunk(self, chunk: list):
+        valid = []
+        for line, (record, error) in chunk:
+            if error is not None:
+                self._reject(line, error)
+                continue
+            try:
+                valid.append((line, self.schema.load(record)))
+            except ValidationError as e:
+                self._reject(line, "; ".join(f"{k}: {' '.join(v)}" for k, v in e.messages.items()))
+
+        taken_usernames = {row.username for row in db.session.query(User.username).filter(
+            User.username.in_([data["username"] for _, data in valid]))}
+        taken_emails = {row.email for row in db.session.query(User.email).filter(
+            User.email.in_([data["email"] for _, data in valid]))}
+        unique = []
+        for line, data in valid:
+            if data["username"] in taken_usernames or data["username"] in self._usernames:
+                self._reject(line, "username: Username already in use")
+            elif data["email"] in taken_emails or data["email"] in self._emails:
+                self._reject(line, "email: Email already in use")
+            else:
+                self._usernames.add(data["username"])
+                self._emails.add(data["email"])
+                unique.append(data)
+        if not unique:
+            return
+
+        passwords = [data.pop("password") for data in unique]
+        if self.pool is None:
+            hashes = map(self.hash, passwords)
+        else:
+            hashes = self.pool.map(self.hash, passwords, chunksize=max(len(passwords) // 64, 1))
+        now = datetime.utcnow()
+        # executemany needs the same keys in every row, about_me is optional
+        rows = [dict(data, about_me=data.get("about_me"), username_lower=data["username"].lower(),
+                     password_hash=password_hash, member_since=now, last_seen=now, updated_at=now)
+                for data, password_hash in zip(unique, hashes)]
+        db.session.execute(User.__table__.insert(), rows)
+        db.session.commit()
+        self.imported += len(rows)
@@ -0,0 +1,56 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class UsernameIndex:
+    """Sorted in-memory list of (lowercased username, user id) for prefix lookups.
+
+    Index is loaded and reloaded by background task, so lookups never
+    touch the database. Users created or renamed by this process are
+    applied incrementally, changes made by other workers show up on next
+    reload.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def loaded(self) -> bool:
+        """Tell if index was loaded and can be searched."""
+        return self._loaded
+
+    def load(self, rows):
+        """Replace index with (username_lower, user_id) rows."""
+        entries = sorted((username, user_id) for username, user_id in rows)
+        with self._lock:
+            self._entries = entries
+            self._loaded = True
+
+    def add(self, username: str, user_id: int):
+        """Add user to index."""
+        with self._lock:
+            if self._loaded:
+                insort(self._entries, (username, user_id))
+
+    def remove(self, username: str, user_id: int):
+        """Remove user from index."""
+        with self._lock:
+            i = bisect_left(self._entries, (username, user_id))
+            if i < len(self._entries) and self._entries[i] == (username, user_id):
+                del self._entries[i]
+
+    def search(self, prefix: str, limit: int) -> list:
+        """Return ids of first 'limit' users whose lowercased username starts with prefix."""
+        ids = []
+        with self._lock:
+            for i in range(bisect_left(self._entries, (prefix,)), len(self._entries)):
+                username, user_id = self._entries[i]
+                if not username.startswith(prefix) or len(ids) == limit:
+                    break
+                ids.append(user_id)
+        return ids
@@ -0,0 +1,127 @@
+"""Compare home feed read and post write costs of fan-out-on-read and fan-out-on-write.
+
+Usage:
+    python -m benchmarks.feed [posts] [database file]
+
+Populates SQLite database with synthetic users, follows and posts, then
+times feed pages for a heavy reader and post creation for authors with
+different follower counts under both strategies.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from api import create_app, db, timeline
+from api.loading import eager_options
+from api.models import Post, User
+from api.resources.posts import paginate_posts, post_schema
+from config import Config
+
+USERS = 10000
+FOLLOWS_PER_USER = 20
+HEAVY_READER_FOLLOWS = 2000
+CELEBRITY_FOLLOWERS = 5000
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = None
+    FEED_CELEBRITY_THRESHOLD = 1000
+
+
+def populate(conn, posts: int):
+    """Fill database with synthetic users, follows, posts and materialized timelines."""
+    now = datetime.utcnow()
+    conn.execute(text(
+        "INSERT INTO users (user_id, username, email, fanout_on_read) VALUES (:id, :name, :email, 0)"
+    ), [{"id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in range(1, USERS + 1)])
+
+    follows = {(u, random.randint(3, USERS)) for u in range(3, USERS + 1) for _ in range(FOLLOWS_PER_USER)}
+    follows |= {(1, u) for u in random.sample(range(3, USERS + 1), HEAVY_READER_FOLLOWS)}
+    follows |= {(u, 2) for u in random.sample(range(3, USERS + 1), CELEBRITY_FOLLOWERS)}
+    follows = {(a, b) for a, b in follows if a != b}
+    conn.execute(text("INSERT INTO followers (follower_id, followed_id) VALUES (:a, :b)"),
+                 [{"a": a, "b": b} for a, b in follows])
+
+    conn.execute(text(
+        "INSERT INTO posts (title, content, created_at, author_id) VALUES ('Title', 'Content', :created_at, :author_id)"
+    ), [{"created_at": now - timedelta(seconds=random.randint(0, 10 ** 7)),
+         "author_id": random.randint(3, USERS)} for _ in range(posts)])
+    conn.execute(text("UPDATE users SET fanout_on_read = 1 WHERE user_id IN "
+                      "(SELECT followed_id FROM followers GROUP BY followed_id HAVING count(*) >= :n)"),
+                 {"n": BenchConfig.FEED_CELEBRITY_THRESHOLD})
+    conn.execute(text(
+        "INSERT INTO timeline_entries (user_id, post_id, author_id, created_at) "
+        "SELECT followers.follower_id, posts.post_id, posts.author_id, posts.created_at "
+        "FROM posts JOIN followers ON followers.followed_id = posts.author_id "
+        "JOIN users ON users.user_id = posts.author_id WHERE NOT users.fanout_on_read"
+    ))
+    conn.execute(text("ANALYZE"))
+
+
+def timed(func, repeat: int) -> float:
+    """Return average milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_reads(app, repeat: int = 50):
+    reader = db.session.get(User, 1)
+    options = eager_options(Post, post_schema)
+    for name, fanout in (("fan-out-on-read", False), ("fan-out-on-write", True)):
+        app.config["FEED_FANOUT_ON_WRITE"] = fanout
+
+        def read():
+            pagination = {"limit": 20, "offset": 0}
+            for _ in range(5):
+                if fanout:
+                    _, pagination = timeline.paginate_timeline(reader, pagination, options)
+                else:
+                    pagination = paginate_posts(reader.select_feed(), pagination)["pagination"]
+                pagination = {"limit": 20, "offset": 0, "cursor": pagination["next_cursor"]}
+
+        print(f"  {name:<18} read 5 pages     {timed(read, repeat):10.3f} ms")
+
+
+def bench_writes(app, repeat: int = 20):
+    authors = (("regular author", 3), ("celebrity author", 2))
+    for name, fanout in (("fan-out-on-read", False), ("fan-out-on-write", True)):
+        app.config["FEED_FANOUT_ON_WRITE"] = fanout
+        for label, author_id in authors:
+            author = db.session.get(User, author_id)
+
+            def write():
+                post = Post(author=author, title="Title", content="Content")
+                db.session.add(post)
+                db.session.flush()
+                timeline.fan_out(post)
+                db.session.commit()
+
+            print(f"  {name:<18} {label:<16} {timed(write, repeat):10.3f} ms")
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    BenchConfig.SQLALCHEMY_DATABASE_URI = "sqlite:///" + path
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            print(f"Populating {posts} posts into {path} ...")
+            populate(conn, posts)
+        print("Feed reads:")
+        bench_reads(app)
+        print("Post writes:")
+        bench_writes(app)
+
+
+if __name__ == "__main__":
+    main()
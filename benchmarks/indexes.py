@@ -0,0 +1,139 @@
+"""Compare query plans and timings with and without access pattern indexes.
+
+Usage:
+    python -m benchmarks.indexes [rows] [database file]
+
+Populates SQLite database with given number of posts (1M by default) plus
+proportional users, follows and tokens, then runs hot queries of the API
+against the indexed schema and against the schema as it was before
+migration d73fd8a8aeae.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from api import create_app, db
+from config import Config
+
+QUERIES = {
+    "user posts page": (
+        "SELECT * FROM posts WHERE author_id = :user_id "
+        "ORDER BY created_at DESC, post_id DESC LIMIT 10"
+    ),
+    "all posts page": (
+        "SELECT * FROM posts ORDER BY created_at DESC, post_id DESC LIMIT 10"
+    ),
+    "user followers page": (
+        "SELECT users.* FROM users JOIN followers ON followers.follower_id = users.user_id "
+        "WHERE followers.followed_id = :user_id ORDER BY users.user_id LIMIT 10"
+    ),
+    "home feed page": (
+        "SELECT posts.* FROM posts JOIN followers ON followers.followed_id = posts.author_id "
+        "WHERE followers.follower_id = :user_id "
+        "ORDER BY posts.created_at DESC, posts.post_id DESC LIMIT 10"
+    ),
+    "is following": (
+        "SELECT 1 FROM followers WHERE follower_id = :user_id AND followed_id = :other_id"
+    ),
+    "user tokens": "SELECT * FROM tokens WHERE user_id = :user_id",
+    "expired tokens": "SELECT count(*) FROM tokens WHERE refresh_expiration < :cutoff",
+}
+
+OLD_SCHEMA = [
+    "DROP INDEX ix_posts_author_id_created_at",
+    "DROP INDEX ix_posts_created_at",
+    "DROP INDEX ix_tokens_refresh_expiration",
+    "DROP INDEX ix_tokens_user_id",
+    "CREATE TABLE followers_old AS SELECT follower_id, followed_id FROM followers",
+    "DROP TABLE followers",
+    "ALTER TABLE followers_old RENAME TO followers",
+]
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = None
+
+
+def populate(conn, rows: int):
+    """Fill database with synthetic data."""
+    users = max(rows // 100, 10)
+    now = datetime.utcnow()
+    conn.execute(text(
+        "INSERT INTO users (user_id, username, email) VALUES (:id, :name, :email)"
+    ), [{"id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in range(1, users + 1)])
+
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append({
+            "author_id": random.randint(1, users),
+            "created_at": now - timedelta(seconds=random.randint(0, 10 ** 7)),
+        })
+        if len(batch) == 10000 or i == rows:
+            conn.execute(text(
+                "INSERT INTO posts (title, content, created_at, author_id) "
+                "VALUES ('Title', 'Content', :created_at, :author_id)"
+            ), batch)
+            batch = []
+
+    follows = {(random.randint(1, users), random.randint(1, users)) for _ in range(rows // 2)}
+    conn.execute(text(
+        "INSERT INTO followers (follower_id, followed_id) VALUES (:a, :b)"
+    ), [{"a": a, "b": b} for a, b in follows])
+
+    conn.execute(text(
+        "INSERT INTO tokens (access_token, access_expiration, refresh_token, "
+        "refresh_expiration, user_id) VALUES ('a', :exp, 'r', :exp, :user_id)"
+    ), [{"exp": now - timedelta(days=random.randint(-7, 30)), "user_id": random.randint(1, users)}
+        for _ in range(rows // 2)])
+    return users
+
+
+def run_queries(conn, users: int, repeat: int = 50):
+    """Print query plan and average latency of every query."""
+    params = {"user_id": random.randint(1, users), "other_id": random.randint(1, users),
+              "cutoff": datetime.utcnow() - timedelta(days=1)}
+    for name, sql in QUERIES.items():
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(text(sql), params).fetchall()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f"  {name:<22} {elapsed:10.3f} ms")
+        for row in plan:
+            print(f"      {row[-1]}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    BenchConfig.SQLALCHEMY_DATABASE_URI = "sqlite:///" + path
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            print(f"Populating {rows} posts into {path} ...")
+            users = populate(conn, rows)
+            conn.execute(text("ANALYZE"))
+
+        with db.engine.connect() as conn:
+            print("With indexes:")
+            run_queries(conn, users)
+
+        with db.engine.begin() as conn:
+            for statement in OLD_SCHEMA:
+                conn.execute(text(statement))
+            conn.execute(text("ANALYZE"))
+
+        with db.engine.connect() as conn:
+            print("Without indexes:")
+            run_queries(conn, users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measure login throughput and concurrent read latency under password hashing settings.
+
+Usage:
+    python -m benchmarks.login [seconds] [database file]
+
+Runs login threads hammering POST /tokens next to reader threads calling
+GET /me in one process, like request threads of one gthread worker, with
+hashing inline in request threads and in bounded pools of different sizes,
+and prints logins and rejected (503) logins per second and median/p99
+read latency.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from api import create_app, db
+from api.hashing import PasswordHasher
+from api.models import User
+from config import Config
+
+LOGIN_THREADS = 8
+READ_THREADS = 4
+# (name, hashing threads, most hashes running or waiting at once)
+SETTINGS = (("inline", 0, 0), ("pool of 1", 1, 1000), ("pool of 2", 2, 1000),
+            ("pool of 4", 4, 1000), ("pool 2 cap 4", 2, 4))
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = None
+
+
+def run(app, seconds: float):
+    """Return (logins per second, rejected logins per second, read latencies in ms) of one run."""
+    with app.test_client() as client:
+        access_token = client.post("/tokens", auth=("bob", "cat")).json["access_token"]
+    stop = threading.Event()
+    logins = []
+    rejected = []
+    latencies = []
+
+    def login():
+        client = app.test_client()
+        while not stop.is_set():
+            resp = client.post("/tokens", auth=("bob", "cat"))
+            (rejected if resp.status_code == 503 else logins).append(1)
+
+    def read():
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {access_token}"}
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/me", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=login) for _ in range(LOGIN_THREADS)]
+    threads += [threading.Thread(target=read) for _ in range(READ_THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return len(logins) / seconds, len(rejected) / seconds, latencies
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    BenchConfig.SQLALCHEMY_DATABASE_URI = "sqlite:///" + path
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bob", email="bob@example.com", password="cat"))
+        db.session.commit()
+
+    print(f"{LOGIN_THREADS} login and {READ_THREADS} reader threads, "
+          f"{app.config['PASSWORD_HASH_METHOD']}, {seconds}s each:")
+    for name, workers, max_pending in SETTINGS:
+        app.extensions["password_hasher"] = PasswordHasher(
+            app.config["PASSWORD_HASH_METHOD"], workers, max_pending)
+        rate, rejected, latencies = run(app, seconds)
+        app.extensions["password_hasher"].shutdown()
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else float("nan")
+        print(f"  {name:<12} {rate:8.1f} logins/s {rejected:8.1f} rejected/s   read median "
+              f"{statistics.median(latencies):8.3f} ms   p99 {p99:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
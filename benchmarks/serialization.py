@@ -0,0 +1,74 @@
+"""Compare marshmallow + json and compiled dumper + orjson on paginated responses.
+
+Usage:
+    python -m benchmarks.serialization [repeat]
+
+Serializes 100-item pages of posts and users, like GET /posts?limit=100
+and GET /users?limit=100 return, with default and fast paths and checks
+they produce the same bytes.
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from api import create_app, schemas
+from api.models import Post, User
+from api.serialization import OrjsonProvider
+from config import Config
+
+PAGE_SIZE = 100
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+
+
+def make_pages():
+    """Build transient posts and users pages."""
+    now = datetime.utcnow()
+    users = [User(user_id=i, username=f"user{i}", about_me="About me " * 10,
+                  last_seen=now, member_since=now - timedelta(days=i),
+                  followers_count=i, following_count=i, posts_count=i)
+             for i in range(1, PAGE_SIZE + 1)]
+    posts = [Post(post_id=i, title=f"Post {i}", content="Content " * 50,
+                  created_at=now - timedelta(minutes=i), author=users[i % 10])
+             for i in range(1, PAGE_SIZE + 1)]
+    pagination = {"limit": PAGE_SIZE, "offset": 0, "next_cursor": "WyIyMDIyIiwgMTBd"}
+    return (
+        ("posts page", schemas.PostPaginationSchema(), {"posts": posts, "pagination": pagination}),
+        ("users page", schemas.UserPaginationSchema(), {"users": users, "pagination": pagination}),
+    )
+
+
+def timed(func, repeat: int) -> float:
+    """Return average milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = create_app(BenchConfig)
+    default, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+    with app.app_context():
+        for name, schema, obj in make_pages():
+            def slow_path():
+                app.config["SCHEMA_COMPILED_DUMP"] = False
+                return default.response(schema.dump(obj)).get_data()
+
+            def fast_path():
+                app.config["SCHEMA_COMPILED_DUMP"] = True
+                return fast.response(schema.dump(obj)).get_data()
+
+            assert slow_path() == fast_path(), "fast path output differs"
+            slow, quick = timed(slow_path, repeat), timed(fast_path, repeat)
+            print(f"  {name:<12} marshmallow + json {slow:8.3f} ms   "
+                  f"compiled + orjson {quick:8.3f} ms   x{slow / quick:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,3 @@
 flask db upgrade
-exec gunicorn -b :5000 run:app
\ No newline at end of file
+# Threaded workers serve other requests while logins wait on password hashing.
+exec gunicorn -b :5000 -k gthread --workers ${GUNICORN_WORKERS:-2} --threads ${GUNICORN_THREADS:-8} run:app
\ No newline at end of file
@@ -27,6 +27,99 @@ class Config:
     REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
     REFRESH_TOKEN_IN_BODY = as_bool(os.environ.get("REFRESH_TOKEN_IN_BODY"))
     REFRESH_TOKEN_IN_COOKIE = as_bool(os.environ.get("REFRESH_TOKEN_IN_COOKIE", "yes"))
+    # Issue access tokens signed with SECRET_KEY, verified without database lookup
+    ACCESS_TOKEN_SIGNED = as_bool(os.environ.get("ACCESS_TOKEN_SIGNED"))
+
+    # Expired tokens purge, interval in seconds, 0 disables background purge
+    TOKEN_PURGE_INTERVAL = int(os.environ.get("TOKEN_PURGE_INTERVAL", "0"))
+    TOKEN_PURGE_BATCH_SIZE = int(os.environ.get("TOKEN_PURGE_BATCH_SIZE", "1000"))
+    TOKEN_PURGE_PAUSE = float(os.environ.get("TOKEN_PURGE_PAUSE", "0.1"))
+
+    # Access token verification cache, 0 size disables it. Invalidation file
+    # is shared by workers of one host to drop revoked tokens from every cache,
+    # it is in instance folder unless set. Hosts behind one load balancer
+    # do not share it, keep TOKEN_CACHE_TTL short or disable cache there.
+    TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE") or "10000")
+    TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", "60"))
+    TOKEN_CACHE_INVALIDATION_FILE = os.environ.get("TOKEN_CACHE_INVALIDATION_FILE")
+    # Seconds between logging of cache hit/miss counters of every worker, 0 disables
+    TOKEN_CACHE_STATS_INTERVAL = int(os.environ.get("TOKEN_CACHE_STATS_INTERVAL") or "300")
+
+    # Level of application log, periodic tasks report at INFO
+    LOG_LEVEL = os.environ.get("LOG_LEVEL") or "INFO"
+
+    # Werkzeug password hash method, e.g. pbkdf2:sha256:600000. Hashes made
+    # with other method are upgraded on next successful login. Hashing runs
+    # in at most PASSWORD_HASH_WORKERS threads per process, 0 hashes inline.
+    # More than PASSWORD_HASH_MAX_PENDING hashes running or waiting in one
+    # process are rejected with 503; keep it below gunicorn threads per
+    # worker (GUNICORN_THREADS in boot.sh) so requests not hashing get served.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD") or "pbkdf2:sha256"
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "4"))
+
+    # Materialize home timelines on post creation. Posts of authors with at
+    # least FEED_CELEBRITY_THRESHOLD followers are merged in on read instead.
+    FEED_FANOUT_ON_WRITE = as_bool(os.environ.get("FEED_FANOUT_ON_WRITE"))
+    FEED_CELEBRITY_THRESHOLD = int(os.environ.get("FEED_CELEBRITY_THRESHOLD", "10000"))
+    FEED_BACKFILL_SIZE = int(os.environ.get("FEED_BACKFILL_SIZE", "100"))
+
+    # Response cache of public listings: "" disables it, "memory" keeps it
+    # per process, "redis" shares it between workers at RESPONSE_CACHE_URL.
+    # TTLs in seconds can be set per endpoint in RESPONSE_CACHE_TTLS.
+    RESPONSE_CACHE_TYPE = os.environ.get("RESPONSE_CACHE_TYPE", "")
+    RESPONSE_CACHE_URL = os.environ.get("RESPONSE_CACHE_URL") or "redis://localhost:6379/0"
+    RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1000"))
+    RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "30"))
+    RESPONSE_CACHE_TTLS = {
+        "posts.all": int(os.environ.get("RESPONSE_CACHE_TTL_POSTS", "10")),
+        "posts.all_user_posts": int(os.environ.get("RESPONSE_CACHE_TTL_USER_POSTS", "30")),
+        "users.all": int(os.environ.get("RESPONSE_CACHE_TTL_USERS", "60")),
+        "users.search": int(os.environ.get("RESPONSE_CACHE_TTL_USERS", "60")),
+        "follows.followed": int(os.environ.get("RESPONSE_CACHE_TTL_FOLLOWS", "60")),
+        "follows.followers": int(os.environ.get("RESPONSE_CACHE_TTL_FOLLOWS", "60")),
+    }
+
+    # Dump output schemas with precompiled dumpers and encode JSON responses
+    # with orjson when it is installed. Both produce the same bytes as default.
+    SCHEMA_COMPILED_DUMP = as_bool(os.environ.get("SCHEMA_COMPILED_DUMP", "yes"))
+    JSON_ORJSON = as_bool(os.environ.get("JSON_ORJSON", "yes"))
+
+    # Response compression negotiated by Accept-Encoding. Algorithms are in
+    # server preference order, br and zstd need brotli and zstandard packages.
+    # Bodies smaller than COMPRESS_MIN_SIZE bytes are sent uncompressed.
+    COMPRESS = as_bool(os.environ.get("COMPRESS", "yes"))
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_ALGORITHMS = (os.environ.get("COMPRESS_ALGORITHMS") or "br,zstd,gzip").split(",")
+    COMPRESS_LEVELS = {
+        "application/json": {"br": 4, "zstd": 3, "gzip": 6},
+        "application/x-ndjson": {"br": 1, "zstd": 1, "gzip": 1},
+        "text/html": {"br": 6, "zstd": 6, "gzip": 6},
+    }
+
+    # Username prefix search ranks this many matches. In-memory index of
+    # usernames skips the database range seek. It is loaded in background
+    # at start, searches use the database until then, and reloaded every
+    # USERNAME_INDEX_REFRESH_INTERVAL seconds to pick up other workers' users.
+    USERNAME_SEARCH_CANDIDATES = int(os.environ.get("USERNAME_SEARCH_CANDIDATES", "50"))
+    USERNAME_INDEX = as_bool(os.environ.get("USERNAME_INDEX"))
+    USERNAME_INDEX_REFRESH_INTERVAL = int(os.environ.get("USERNAME_INDEX_REFRESH_INTERVAL", "300"))
+
+    # Seconds row counts behind pagination totals are reused
+    PAGINATION_COUNT_TTL = int(os.environ.get("PAGINATION_COUNT_TTL", "10"))
+    PAGINATION_COUNT_CACHE_SIZE = int(os.environ.get("PAGINATION_COUNT_CACHE_SIZE", "1000"))
+
+    # Most posts accepted by one batch create request
+    POST_BATCH_MAX_SIZE = int(os.environ.get("POST_BATCH_MAX_SIZE", "500"))
+
+    # Rows fetched at once by streaming NDJSON exports
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
 
     # cross origin resource sharing 
     USE_CORS = as_bool(os.environ.get("USE_CORS"))
+
+    # Seconds user last seen time may stay buffered before it is written
+    LAST_SEEN_STALENESS = int(os.environ.get("LAST_SEEN_STALENESS", "60"))
+    LAST_SEEN_BUFFER_SIZE = int(os.environ.get("LAST_SEEN_BUFFER_SIZE", "1000"))
+    # Seconds between flushes of buffer in background, also flushed on exit, 0 disables both
+    LAST_SEEN_FLUSH_INTERVAL = int(os.environ.get("LAST_SEEN_FLUSH_INTERVAL") or LAST_SEEN_STALENESS)
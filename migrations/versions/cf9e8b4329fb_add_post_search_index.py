@@ -0,0 +1,60 @@
+"""add post search index
+
+Revision ID: cf9e8b4329fb
+Revises: 37d9e96c0eb4
+Create Date: 2026-10-18 20:56:07.129234
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf9e8b4329fb'
+down_revision = '37d9e96c0eb4'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', content), 'B')"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5(title, content, content='posts', "
+            "content_rowid='post_id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN "
+            "INSERT INTO posts_fts(rowid, title, content) VALUES (new.post_id, new.title, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, title, content) "
+            "VALUES ('delete', old.post_id, old.title, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN "
+            "INSERT INTO posts_fts(posts_fts, rowid, title, content) "
+            "VALUES ('delete', old.post_id, old.title, old.content); "
+            "INSERT INTO posts_fts(rowid, title, content) VALUES (new.post_id, new.title, new.content); END"
+        )
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute(f"CREATE INDEX ix_posts_search ON posts USING gin (({SEARCH_VECTOR}))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER posts_fts_update")
+        op.execute("DROP TRIGGER posts_fts_delete")
+        op.execute("DROP TRIGGER posts_fts_insert")
+        op.execute("DROP TABLE posts_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX ix_posts_search")
@@ -0,0 +1,62 @@
+"""add indexes for posts, followers and tokens
+
+Revision ID: d73fd8a8aeae
+Revises: 3159ab2a056d
+Create Date: 2026-10-18 20:19:07.199350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd73fd8a8aeae'
+down_revision = '3159ab2a056d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rebuild 'followers' with a composite primary key, dropping duplicate
+    # and incomplete rows that the old table allowed.
+    op.create_table('followers_new',
+    sa.Column('follower_id', sa.Integer(), nullable=False),
+    sa.Column('followed_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['followed_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['follower_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('follower_id', 'followed_id')
+    )
+    op.execute(
+        "INSERT INTO followers_new (follower_id, followed_id) "
+        "SELECT DISTINCT follower_id, followed_id FROM followers "
+        "WHERE follower_id IS NOT NULL AND followed_id IS NOT NULL"
+    )
+    op.drop_table('followers')
+    op.rename_table('followers_new', 'followers')
+    op.create_index('ix_followers_followed_id_follower_id', 'followers', ['followed_id', 'follower_id'], unique=False)
+
+    op.create_index('ix_posts_author_id_created_at', 'posts', ['author_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_posts_created_at'), 'posts', ['created_at'], unique=False)
+    op.create_index(op.f('ix_tokens_refresh_expiration'), 'tokens', ['refresh_expiration'], unique=False)
+    op.create_index(op.f('ix_tokens_user_id'), 'tokens', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_tokens_user_id'), table_name='tokens')
+    op.drop_index(op.f('ix_tokens_refresh_expiration'), table_name='tokens')
+    op.drop_index(op.f('ix_posts_created_at'), table_name='posts')
+    op.drop_index('ix_posts_author_id_created_at', table_name='posts')
+
+    op.drop_index('ix_followers_followed_id_follower_id', table_name='followers')
+    op.create_table('followers_old',
+    sa.Column('follower_id', sa.Integer(), nullable=True),
+    sa.Column('followed_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['followed_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['follower_id'], ['users.user_id'], )
+    )
+    op.execute(
+        "INSERT INTO followers_old (follower_id, followed_id) "
+        "SELECT follower_id, followed_id FROM followers"
+    )
+    op.drop_table('followers')
+    op.rename_table('followers_old', 'followers')
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest 
 
 from api import create_app, db
@@ -9,6 +11,10 @@ class TestConfig(Config):
     TESTING = True 
     SQLALCHEMY_DATABASE_URI = "sqlite://"
     REFRESH_TOKEN_IN_BODY = True
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    LAST_SEEN_FLUSH_INTERVAL = 0
+    TOKEN_CACHE_STATS_INTERVAL = 0
+    TOKEN_CACHE_INVALIDATION_FILE = os.path.join(tempfile.mkdtemp(), "token-invalidations.log")
 
 
 class BaseTestCase(unittest.TestCase):
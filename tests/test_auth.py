@@ -1,6 +1,10 @@
 from datetime import datetime, timedelta
 from unittest import mock
-from .base_test_case import BaseTestCase
+
+from sqlalchemy import event
+
+from api.models import db
+from .base_test_case import BaseTestCase, TestConfig
 
 
 class TestAuth(BaseTestCase):
@@ -87,5 +91,83 @@ class TestAuth(BaseTestCase):
         resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
         assert resp.status_code == 401
 
+    def test_cached_token_is_revoked(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        assert resp.status_code == 201
+        access_token = resp.json["access_token"]
+
+        for _ in range(2):
+            resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
+            assert resp.status_code == 200
+        cache = self.app.extensions["token_cache"]
+        assert cache.stats()["hits"] == 1
+
+        resp = self.client.delete("/tokens", json={"access_token": access_token})
+        assert resp.status_code == 204
+
+        resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
+        assert resp.status_code == 401
+
+
+class SignedTokenConfig(TestConfig):
+    SECRET_KEY = "secret"
+    ACCESS_TOKEN_SIGNED = True
 
 
+class TestSignedTokens(BaseTestCase):
+    config = SignedTokenConfig
+
+    def test_verify_without_token_query(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        assert resp.status_code == 201
+        access_token = resp.json["access_token"]
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        assert resp.status_code == 200
+        assert resp.json["username"] == "bob"
+        assert not [s for s in statements if "tokens" in s]
+
+        tampered = "2" + access_token[1:]
+        resp = self.client.get("/me", headers={"Authorization": f"Bearer {tampered}"})
+        assert resp.status_code == 401
+
+    def test_signed_token_expired(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        access_token = resp.json["access_token"]
+
+        with mock.patch("api.models.datetime") as dt:
+            dt.utcnow.return_value = datetime.utcnow() + timedelta(days=1)
+            resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
+            assert resp.status_code == 401
+
+    def test_revoke_signed_token(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        access_token = resp.json["access_token"]
+
+        resp = self.client.delete("/tokens", json={"access_token": access_token})
+        assert resp.status_code == 204
+
+        resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
+        assert resp.status_code == 401
+
+    def test_refresh_signed_token(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        access_token1 = resp.json["access_token"]
+        refresh_token = resp.json["refresh_token"]
+
+        resp = self.client.put("/tokens", json={"access_token": access_token1, "refresh_token": refresh_token})
+        assert resp.status_code == 201
+        access_token2 = resp.json["access_token"]
+
+        resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token2}"})
+        assert resp.status_code == 200
+
+        resp = self.client.get("/me", headers={"Authorization": f"Bearer {access_token1}"})
+        assert resp.status_code == 401
@@ -0,0 +1,127 @@
+import time
+
+from api.cache import MemoryBackend, RedisBackend
+from api.models import db, User
+from .base_test_case import BaseTestCase, TestConfig
+
+
+class FakeRedis:
+    """Redis stand-in implementing commands used by cache backend."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = (str(value).encode(), None)
+        return value
+
+
+class CacheConfig(TestConfig):
+    RESPONSE_CACHE_TYPE = "memory"
+
+
+class TestCacheBackends(BaseTestCase):
+    def test_memory_backend(self):
+        backend = MemoryBackend(max_size=2)
+        backend.set("a", b"1", 60)
+        backend.set("b", b"2", 60)
+        assert backend.get("a") == b"1"
+        backend.set("c", b"3", 60)
+        assert backend.get("b") is None
+        assert backend.get("a") == b"1"
+
+        backend.set("d", b"4", 0)
+        assert backend.get("d") is None
+
+        assert backend.generation("posts") == 0
+        backend.bump("posts")
+        assert backend.generation("posts") == 1
+        assert backend.generation("users") == 0
+
+    def test_redis_backend(self):
+        client = FakeRedis()
+        backend = RedisBackend(client)
+        backend.set("a", b"1", 60)
+        assert backend.get("a") == b"1"
+        assert backend.get("b") is None
+        backend.bump("posts")
+        backend.bump("posts")
+        assert backend.generation("posts") == 2
+        assert all(key.startswith("response-cache:") for key in client.data)
+
+
+class TestResponseCache(BaseTestCase):
+    config = CacheConfig
+
+    def setUp(self):
+        super().setUp()
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        self.headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+
+    def test_disabled(self):
+        self.app.extensions["response_cache"] = None
+        resp = self.client.get("/posts")
+        assert resp.status_code == 200
+        assert "X-Cache" not in resp.headers
+
+    def test_listing_is_cached(self):
+        resp = self.client.get("/posts?limit=5&offset=0")
+        assert resp.headers["X-Cache"] == "MISS"
+        resp = self.client.get("/posts?offset=0&limit=5")
+        assert resp.headers["X-Cache"] == "HIT"
+        resp = self.client.get("/posts?limit=6")
+        assert resp.headers["X-Cache"] == "MISS"
+
+        resp = self.client.get("/users/555/posts")
+        assert resp.status_code == 404
+        resp = self.client.get("/users/555/posts")
+        assert "X-Cache" not in resp.headers
+
+    def test_invalidated_by_writes(self):
+        assert self.client.get("/posts").json["posts"] == []
+        assert self.client.get("/users/1/posts").json["posts"] == []
+        assert self.client.get("/users").json["users"][0]["posts_count"] == 0
+
+        resp = self.client.post("/posts", headers=self.headers, json={"title": "Title", "content": "Content"})
+        assert resp.status_code == 201
+        resp = self.client.get("/posts")
+        assert resp.headers["X-Cache"] == "MISS"
+        assert len(resp.json["posts"]) == 1
+        assert len(self.client.get("/users/1/posts").json["posts"]) == 1
+        assert self.client.get("/users").json["users"][0]["posts_count"] == 1
+
+        resp = self.client.put("/posts/1", headers=self.headers, json={"title": "Another title"})
+        assert self.client.get("/posts").json["posts"][0]["title"] == "Another title"
+
+        resp = self.client.put("/me", headers=self.headers, json={"about_me": "Hello"})
+        assert self.client.get("/posts").json["posts"][0]["author"]["about_me"] == "Hello"
+
+        db.session.add(User(username="alice", email="alice@example.com", password="dog"))
+        db.session.commit()
+        assert self.client.get("/users/2/followers").json["users"] == []
+        resp = self.client.post("/me/following/2", headers=self.headers)
+        assert resp.status_code == 204
+        resp = self.client.get("/users/2/followers")
+        assert resp.headers["X-Cache"] == "MISS"
+        assert resp.json["users"][0]["username"] == "bob"
+
+        resp = self.client.delete("/posts/1", headers=self.headers)
+        assert resp.status_code == 204
+        assert self.client.get("/posts").json["posts"] == []
+
+    def test_ttl(self):
+        self.app.config["RESPONSE_CACHE_TTLS"] = {"posts.all": 0}
+        self.client.get("/posts")
+        resp = self.client.get("/posts")
+        assert resp.headers["X-Cache"] == "MISS"
@@ -0,0 +1,68 @@
+import gzip
+import zlib
+
+from flask import Response
+
+from api.models import db, Post, User
+from .base_test_case import BaseTestCase
+
+
+class TestCompression(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        bob = User.query.get(1)
+        for i in range(20):
+            db.session.add(Post(author=bob, title=f"Post {i}", content="Content " * 50))
+        db.session.commit()
+
+    def test_gzip(self):
+        plain = self.client.get("/posts?limit=20")
+        assert "Content-Encoding" not in plain.headers
+        assert plain.headers["Vary"] == "Accept-Encoding"
+
+        resp = self.client.get("/posts?limit=20", headers={"Accept-Encoding": "gzip, deflate"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["Vary"] == "Accept-Encoding"
+        assert int(resp.headers["Content-Length"]) < len(plain.data) // 4
+        assert gzip.decompress(resp.data) == plain.data
+        assert resp.headers["ETag"] == plain.headers["ETag"]
+
+        resp = self.client.get("/posts?limit=20", headers={"Accept-Encoding": "gzip",
+                                                           "If-None-Match": plain.headers["ETag"]})
+        assert resp.status_code == 304
+        assert "Content-Encoding" not in resp.headers
+
+    def test_skipped(self):
+        resp = self.client.get("/users/1", headers={"Accept-Encoding": "gzip"})
+        assert len(resp.data) < self.app.config["COMPRESS_MIN_SIZE"]
+        assert "Content-Encoding" not in resp.headers
+
+        resp = self.client.get("/posts?limit=20", headers={"Accept-Encoding": "gzip;q=0"})
+        assert "Content-Encoding" not in resp.headers
+
+        self.app.config["COMPRESS_ALGORITHMS"] = ["unknown"]
+        resp = self.client.get("/posts?limit=20", headers={"Accept-Encoding": "unknown, gzip"})
+        assert "Content-Encoding" not in resp.headers
+
+        self.app.config["COMPRESS_ALGORITHMS"] = ["gzip"]
+        self.app.config["COMPRESS_LEVELS"] = {"text/html": {"gzip": 6}}
+        resp = self.client.get("/posts?limit=20", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in resp.headers
+
+    def test_streamed(self):
+        chunks = [b'{"n":%d}\n' % i for i in range(100)]
+
+        @self.app.get("/stream")
+        def stream():
+            return Response(iter(chunks), mimetype="application/x-ndjson")
+
+        resp = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in resp.headers
+        assert gzip.decompress(resp.data) == b"".join(chunks)
+
+        resp = self.client.get("/stream", headers={"Accept-Encoding": "gzip"}, buffered=False)
+        decompressor = zlib.decompressobj(31)
+        first = next(resp.response)
+        assert decompressor.decompress(first) == chunks[0]
+        resp.close()
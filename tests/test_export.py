@@ -0,0 +1,54 @@
+import json
+
+from api import schemas
+from api.models import db, Post, User
+from .base_test_case import BaseTestCase
+
+
+class TestExport(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config["EXPORT_BATCH_SIZE"] = 2
+        bob = User.query.get(1)
+        alice = User(username="alice", email="alice@example.com", password="dog")
+        for i in range(5):
+            db.session.add(Post(author=bob if i % 2 else alice, title=f"Post {i}", content="Café"))
+        db.session.commit()
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        self.headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+
+    def test_export_posts(self):
+        resp = self.client.get("/export/posts", headers=self.headers)
+        assert resp.status_code == 200
+        assert resp.mimetype == "application/x-ndjson"
+        assert resp.is_streamed
+        lines = resp.data.decode().splitlines()
+        expected = schemas.PostOutSchema().dump(Post.query.order_by(Post.post_id), many=True)
+        assert [json.loads(line) for line in lines] == expected
+        assert lines[0] == self.app.json.dumps(expected[0], separators=(",", ":"))
+
+        resp = self.client.get("/export/users/1/posts", headers=self.headers)
+        assert [json.loads(line)["post_id"] for line in resp.data.splitlines()] == [2, 4]
+
+        resp = self.client.get("/export/users/555/posts", headers=self.headers)
+        assert resp.status_code == 404
+        resp = self.client.get("/export/posts")
+        assert resp.status_code == 401
+
+    def test_export_users(self):
+        resp = self.client.get("/export/users", headers=self.headers)
+        users = [json.loads(line) for line in resp.data.splitlines()]
+        assert [user["username"] for user in users] == ["bob", "alice"]
+        assert "email" not in users[0]
+
+    def test_export_cli(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["export", "posts", "--batch-size", "3"])
+        assert result.exit_code == 0
+        assert len(result.output.splitlines()) == 5
+
+        result = runner.invoke(args=["export", "posts", "--user-id", "2"])
+        assert [json.loads(line)["author"]["username"] for line in result.output.splitlines()] == ["alice"] * 3
+
+        result = runner.invoke(args=["export", "users"])
+        assert len(result.output.splitlines()) == 2
@@ -0,0 +1,111 @@
+from sqlalchemy import event
+
+from api.models import db, followers, User
+from .base_test_case import BaseTestCase
+
+
+class TestFollows(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ["alice", "charlie", "dave"]:
+            db.session.add(User(username=name, email=f"{name}@example.com", password="dog"))
+        db.session.commit()
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        self.headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+
+    def test_follow_status(self):
+        bob, alice, charlie = [User.query.get(i) for i in (1, 2, 3)]
+        bob.follow(alice)
+        alice.follow(bob)
+        charlie.follow(bob)
+        db.session.commit()
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        resp = self.client.get("/me/following/status?ids=2,3,4,555", headers=self.headers)
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        assert resp.status_code == 200
+        assert resp.json["users"] == [
+            {"user_id": 2, "following": True, "followed_by": True},
+            {"user_id": 3, "following": False, "followed_by": True},
+            {"user_id": 4, "following": False, "followed_by": False},
+            {"user_id": 555, "following": False, "followed_by": False},
+        ]
+        assert len([s for s in statements if "FROM followers" in s]) == 1
+
+        resp = self.client.get("/me/following/status", headers=self.headers)
+        assert resp.status_code == 400
+
+    def test_is_following(self):
+        resp = self.client.get("/me/following/2", headers=self.headers)
+        assert resp.status_code == 404
+
+        resp = self.client.post("/me/following/2", headers=self.headers)
+        assert resp.status_code == 204
+        resp = self.client.post("/me/following/2", headers=self.headers)
+        assert resp.status_code == 409
+
+        resp = self.client.get("/me/following/2", headers=self.headers)
+        assert resp.status_code == 204
+
+        resp = self.client.delete("/me/following/2", headers=self.headers)
+        assert resp.status_code == 204
+        resp = self.client.delete("/me/following/2", headers=self.headers)
+        assert resp.status_code == 409
+
+    def test_follow_is_idempotent(self):
+        bob, alice = User.query.get(1), User.query.get(2)
+        assert bob.follow(alice)
+        assert not bob.follow(alice)
+        db.session.commit()
+        assert (bob.following_count, alice.followers_count) == (1, 1)
+
+        # row inserted by concurrent request after any check would have run
+        db.session.execute(followers.insert().values(follower_id=1, followed_id=3))
+        assert not bob.follow(User.query.get(3))
+        assert bob.unfollow(alice)
+        assert not bob.unfollow(alice)
+        db.session.commit()
+        assert (bob.following_count, alice.followers_count) == (0, 0)
+
+        resp = self.client.post("/me/following/3", headers=self.headers)
+        assert resp.status_code == 409
+
+    def test_follow_many(self):
+        User.query.get(1).follow(User.query.get(2))
+        db.session.commit()
+
+        resp = self.client.post("/me/following", headers=self.headers, json={"user_ids": [2, 3, 4, 3, 555]})
+        assert resp.status_code == 200
+        assert resp.json["results"] == [
+            {"user_id": 2, "status": "already_following"},
+            {"user_id": 3, "status": "followed"},
+            {"user_id": 4, "status": "followed"},
+            {"user_id": 555, "status": "not_found"},
+        ]
+        bob = User.query.get(1)
+        assert bob.following_count == 3
+        assert User.query.get(3).followers_count == 1
+        assert bob.is_following(User.query.get(4))
+
+        resp = self.client.delete("/me/following", headers=self.headers, json={"user_ids": [2, 4, 555]})
+        assert resp.status_code == 200
+        assert resp.json["results"] == [
+            {"user_id": 2, "status": "unfollowed"},
+            {"user_id": 4, "status": "unfollowed"},
+            {"user_id": 555, "status": "not_following"},
+        ]
+        db.session.expire_all()
+        assert User.query.get(1).following_count == 1
+        assert User.query.get(4).followers_count == 0
+        assert not User.query.get(1).is_following(User.query.get(2))
+        resp = self.client.get("/me/following?with_total=true", headers=self.headers)
+        assert resp.json["pagination"]["total"] == 1
+        assert resp.json["pagination"]["total_exact"] is True
+
+        resp = self.client.post("/me/following", headers=self.headers, json={"user_ids": []})
+        assert resp.status_code == 400
@@ -141,3 +141,52 @@ class TestPagination(BaseTestCase):
         assert resp.json["pagination"]["limit"] == 2
         assert resp.json["pagination"]["offset"] == 0
         assert len(resp.json["users"]) == 1
+
+    def test_posts_cursor_pagination(self):
+        u = User.query.filter_by(username="bob").first()
+        assert u is not None
+
+        for i in range(5):
+            db.session.add(Post(author=u, title=f"Post {i}", content=f"Content of post {i}"))
+        db.session.commit()
+
+        resp = self.client.get("/posts?limit=2")
+        assert resp.status_code == 200
+        assert [p["title"] for p in resp.json["posts"]] == ["Post 4", "Post 3"]
+        cursor = resp.json["pagination"]["next_cursor"]
+        assert cursor is not None
+
+        resp = self.client.get(f"/posts?limit=2&cursor={cursor}")
+        assert resp.status_code == 200
+        assert [p["title"] for p in resp.json["posts"]] == ["Post 2", "Post 1"]
+        assert resp.json["pagination"]["cursor"] == cursor
+        cursor = resp.json["pagination"]["next_cursor"]
+
+        resp = self.client.get(f"/posts?limit=2&cursor={cursor}")
+        assert resp.status_code == 200
+        assert [p["title"] for p in resp.json["posts"]] == ["Post 0"]
+        assert resp.json["pagination"]["next_cursor"] is None
+
+    def test_users_cursor_pagination(self):
+        for name in ["alice", "charlie", "dave"]:
+            db.session.add(User(username=name, email=f"{name}@example.com", password="dog"))
+        db.session.commit()
+
+        usernames = []
+        cursor = None
+        while True:
+            url = "/users?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            resp = self.client.get(url)
+            assert resp.status_code == 200
+            usernames += [u["username"] for u in resp.json["users"]]
+            cursor = resp.json["pagination"]["next_cursor"]
+            if cursor is None:
+                break
+        assert usernames == ["bob", "alice", "charlie", "dave"]
+
+    def test_invalid_cursor(self):
+        resp = self.client.get("/posts?cursor=garbage")
+        assert resp.status_code == 400
+
+        resp = self.client.get("/users?limit=0")
+        assert resp.status_code == 400
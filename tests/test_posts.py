@@ -1,4 +1,7 @@
-from .base_test_case import BaseTestCase
+from sqlalchemy import event
+
+from api.models import db, Post, TimelineEntry, User
+from .base_test_case import BaseTestCase, TestConfig
 
 
 class TestPosts(BaseTestCase):
@@ -38,6 +41,121 @@ class TestPosts(BaseTestCase):
         resp = self.client.get("/posts/2")
         assert resp.status_code == 404
 
+    def test_conditional_get(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+        resp = self.client.post("/posts", headers=headers, json={"title": "Title", "content": "Content"})
+        assert resp.status_code == 201
+
+        resp = self.client.get("/posts/1")
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+        last_modified = resp.headers["Last-Modified"]
+        assert etag.startswith('W/"')
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            resp = self.client.get("/posts/1", headers={"If-None-Match": etag})
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        assert len(statements) == 1
+        assert resp.status_code == 304
+        assert resp.data == b""
+        resp = self.client.get("/posts/1", headers={"If-Modified-Since": last_modified})
+        assert resp.status_code == 304
+
+        resp = self.client.put("/posts/1", headers=headers, json={"title": "Another title"})
+        assert resp.status_code == 200
+        resp = self.client.get("/posts/1", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+        etag = resp.headers["ETag"]
+
+        u = User(username="alice", email="alice@example.com", password="dog")
+        db.session.add(u)
+        db.session.commit()
+        u.follow(User.query.get(1))
+        db.session.commit()
+        resp = self.client.get("/posts/1", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.json["author"]["followers_count"] == 1
+
+        resp = self.client.get("/posts")
+        assert resp.status_code == 200
+        resp = self.client.get("/posts", headers={"If-None-Match": resp.headers["ETag"]})
+        assert resp.status_code == 304
+
+    def test_create_posts_batch(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+        resp = self.client.post("/posts", headers=headers, json={"title": "First", "content": "Content"})
+        assert resp.status_code == 201
+
+        data = [{"title": f"Post {i}", "content": f"Content {i}"} for i in range(250)]
+        resp = self.client.post("/posts/batch", headers=headers, json=data)
+        assert resp.status_code == 201
+        assert resp.json["post_ids"] == list(range(2, 252))
+        assert Post.query.get(251).title == "Post 249"
+        assert Post.query.get(251).author.username == "bob"
+        assert User.query.get(1).posts_count == 251
+
+        resp = self.client.post("/posts/batch", headers=headers, json=[{"title": "No content"}])
+        assert resp.status_code == 400
+        resp = self.client.post("/posts/batch", headers=headers, json=[])
+        assert resp.status_code == 400
+        self.app.config["POST_BATCH_MAX_SIZE"] = 2
+        resp = self.client.post("/posts/batch", headers=headers, json=data[:3])
+        assert resp.status_code == 400
+        assert Post.query.count() == 251
+
+    def test_search(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+        data = [
+            {"title": "Cooking", "content": "Serve the soup with bread and a flask of wine"},
+            {"title": "Flask tutorial", "content": "Build a REST API"},
+            {"title": "Gardening", "content": "Nothing to see here"},
+            {"title": "Flask testing", "content": "Running tests of Flask apps"},
+        ]
+        resp = self.client.post("/posts/batch", headers=headers, json=data)
+        assert resp.status_code == 201
+
+        def search(q):
+            resp = self.client.get(f"/posts/search?{q}")
+            assert resp.status_code == 200
+            return [post["title"] for post in resp.json["posts"]], resp.json["pagination"]
+
+        titles, _ = search("q=flask")
+        assert titles[-1] == "Cooking"
+        assert set(titles[:2]) == {"Flask tutorial", "Flask testing"}
+        assert search("q=run")[0] == ["Flask testing"]
+        assert search("q=flask+wine")[0] == ["Cooking"]
+        assert search('q="flask)(-')[0] == titles
+        assert search("q=%2A%2A")[0] == []
+
+        pages, cursor = [], ""
+        while True:
+            page, pagination = search(f"q=flask&limit=1{cursor}")
+            pages += page
+            if pagination["next_cursor"] is None:
+                break
+            cursor = f"&cursor={pagination['next_cursor']}"
+        assert pages == titles
+        assert search("q=flask&limit=1&offset=2")[0] == titles[2:]
+
+        self.client.put("/posts/3", headers=headers, json={"title": "Flask gardening"})
+        self.client.delete("/posts/2", headers=headers)
+        assert set(search("q=flask")[0]) == {"Flask gardening", "Flask testing", "Cooking"}
+        assert search("q=tutorial")[0] == []
+
+        resp = self.client.get("/posts/search")
+        assert resp.status_code == 400
+
     def test_update_post(self):
         resp = self.client.post("/tokens", auth=("bob", "cat"))
         assert resp.status_code == 201
@@ -71,8 +189,241 @@ class TestPosts(BaseTestCase):
         resp = self.client.post("/posts", headers={"Authorization": f"Bearer {access_token}"}, json=data)
         assert resp.status_code == 201
 
+        assert resp.json["author"]["posts_count"] == 1
+
         resp = self.client.delete("/posts/1", headers={"Authorization": f"Bearer {access_token}"})
         assert resp.status_code == 204
+        assert User.query.get(1).posts_count == 0
 
         resp = self.client.delete("/posts/1", headers={"Authorization": f"Bearer {access_token}"})
         assert resp.status_code == 404
+
+    def statements(self, url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            resp = self.client.get(url)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+        assert resp.status_code == 200
+        return statements
+
+    def count_queries(self, url):
+        return len(self.statements(url))
+
+    def test_post_authors_are_eager_loaded(self):
+        u = User.query.filter_by(username="bob").first()
+        db.session.add(Post(author=u, title="Post", content="Content"))
+        db.session.commit()
+        single_author = self.count_queries("/posts?limit=100")
+
+        for i in range(10):
+            author = User(username=f"user{i}", email=f"user{i}@example.com", password="dog")
+            db.session.add(Post(author=author, title=f"Post {i}", content="Content"))
+        db.session.commit()
+        assert self.count_queries("/posts?limit=100") == single_author
+        assert self.count_queries("/users/2/posts?limit=100") == single_author + 1
+        # version lookup for conditional GET, then post joined with author
+        assert self.count_queries("/posts/1") == 2
+
+    def test_sparse_fields(self):
+        bob = User.query.get(1)
+        for i in range(3):
+            db.session.add(Post(author=bob, title=f"Post {i}", content="Content"))
+        db.session.commit()
+
+        resp = self.client.get("/posts?limit=2&fields=post_id,title")
+        assert [set(post) for post in resp.json["posts"]] == [{"post_id", "title"}] * 2
+        cursor = resp.json["pagination"]["next_cursor"]
+        resp = self.client.get(f"/posts?limit=2&fields=title&cursor={cursor}")
+        assert resp.json["posts"] == [{"title": "Post 0"}]
+
+        statements = self.statements("/posts?fields=post_id,title")
+        assert len(statements) == 1
+        assert "posts.content" not in statements[0] and "users" not in statements[0]
+
+        resp = self.client.get("/users/1/posts?fields=title,author.username")
+        assert resp.json["posts"][0] == {"title": "Post 2", "author": {"username": "bob"}}
+        statement = self.statements("/posts?fields=title,author.username")[0]
+        assert "users_1.username" in statement and "users_1.about_me" not in statement
+
+        resp = self.client.get("/posts/1?fields=title")
+        assert resp.json == {"title": "Post 0"}
+        resp = self.client.get("/users?fields=username")
+        assert resp.json["users"] == [{"username": "bob"}]
+
+        for fields in ["nope", "author.nope"]:
+            resp = self.client.get(f"/posts?fields={fields}")
+            assert resp.status_code == 400
+
+    def test_summary_view(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+        content = "word\n" + "lorem ipsum " * 30
+        resp = self.client.post("/posts", headers=headers, json={"title": "Long", "content": content})
+        excerpt = resp.json["excerpt"]
+        assert len(excerpt) <= 200 and excerpt.startswith("word lorem ipsum") and excerpt.endswith("ipsum\u2026")
+        resp = self.client.put("/posts/1", headers=headers, json={"content": "Short"})
+        assert resp.json["excerpt"] == "Short"
+        resp = self.client.post("/posts/batch", headers=headers, json=[{"title": "Batch", "content": content}])
+        assert Post.query.get(resp.json["post_ids"][0]).excerpt == excerpt
+
+        resp = self.client.get("/posts?view=summary")
+        assert resp.json["posts"][1] == {
+            "post_id": 1, "title": "Long", "excerpt": "Short",
+            "created_at": resp.json["posts"][1]["created_at"], "author": {"user_id": 1, "username": "bob"},
+        }
+        statement = self.statements("/users/1/posts?view=summary")[-1]
+        assert "posts.excerpt" in statement and "posts.content" not in statement
+        assert self.client.get("/posts/1?view=summary").json["excerpt"] == "Short"
+        assert self.client.get("/posts?view=full").status_code == 400
+
+        db.session.execute(Post.__table__.update().values(excerpt=None))
+        db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=["posts", "excerpts", "--batch-size", "1"])
+        assert "Updated excerpts of 2 posts." in result.output
+        assert Post.query.get(2).excerpt == excerpt
+
+    def test_pagination_total(self):
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+        for i in range(3):
+            self.client.post("/posts", headers=headers, json={"title": f"Post {i}", "content": "Content"})
+
+        resp = self.client.get("/posts?limit=2")
+        assert "total" not in resp.json["pagination"]
+        assert "with_total" not in resp.json["pagination"]
+
+        resp = self.client.get("/posts?limit=2&with_total=true")
+        assert resp.json["pagination"]["total"] == 3
+        assert resp.json["pagination"]["total_exact"] is True
+        db.session.add(Post(author_id=1, title="Post 3", content="Content"))
+        db.session.commit()
+        resp = self.client.get("/posts?limit=2&with_total=true")
+        assert resp.json["pagination"]["total"] == 3
+        assert resp.json["pagination"]["total_exact"] is False
+
+        # counter is read with the user, no extra query
+        assert self.count_queries("/users/1/posts?with_total=true") == \
+            self.count_queries("/users/1/posts")
+        resp = self.client.get("/users/1/posts?limit=1&with_total=true")
+        assert resp.json["pagination"]["total"] == 3
+        assert resp.json["pagination"]["total_exact"] is True
+
+        resp = self.client.get("/posts/search?q=post&with_total=true")
+        assert resp.json["pagination"]["total"] == 4
+        resp = self.client.get("/posts/search?q=-&with_total=true")
+        assert resp.json["pagination"]["total"] == 0
+
+    def test_feed(self):
+        bob = User.query.filter_by(username="bob").first()
+        alice = User(username="alice", email="alice@example.com", password="dog")
+        charlie = User(username="charlie", email="charlie@example.com", password="dog")
+        db.session.add_all([alice, charlie])
+        bob.follow(alice)
+        bob.follow(charlie)
+        db.session.add(Post(author=alice, title="Alice 1", content="Content"))
+        db.session.add(Post(author=charlie, title="Charlie 1", content="Content"))
+        db.session.add(Post(author=bob, title="Bob 1", content="Content"))
+        db.session.add(Post(author=alice, title="Alice 2", content="Content"))
+        db.session.commit()
+
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        access_token = resp.json["access_token"]
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        resp = self.client.get("/me/feed?limit=2", headers=headers)
+        assert resp.status_code == 200
+        assert [p["title"] for p in resp.json["posts"]] == ["Alice 2", "Charlie 1"]
+
+        cursor = resp.json["pagination"]["next_cursor"]
+        resp = self.client.get(f"/me/feed?limit=2&cursor={cursor}", headers=headers)
+        assert resp.status_code == 200
+        assert [p["title"] for p in resp.json["posts"]] == ["Alice 1"]
+        assert resp.json["pagination"]["next_cursor"] is None
+
+        resp = self.client.get("/me/feed?with_total=true", headers=headers)
+        assert resp.json["pagination"]["total"] == 3
+
+
+class FanoutConfig(TestConfig):
+    FEED_FANOUT_ON_WRITE = True
+    FEED_CELEBRITY_THRESHOLD = 2
+
+
+class TestTimeline(BaseTestCase):
+    config = FanoutConfig
+
+    def setUp(self):
+        super().setUp()
+        for name in ["alice", "charlie", "dave"]:
+            db.session.add(User(username=name, email=f"{name}@example.com", password="dog"))
+        db.session.commit()
+        self.headers = {}
+        for name, password in [("bob", "cat"), ("alice", "dog"), ("charlie", "dog"), ("dave", "dog")]:
+            resp = self.client.post("/tokens", auth=(name, password))
+            self.headers[name] = {"Authorization": f"Bearer {resp.json['access_token']}"}
+
+    def post(self, author, title):
+        resp = self.client.post("/posts", headers=self.headers[author], json={"title": title, "content": "Content"})
+        assert resp.status_code == 201
+        return resp.json["post_id"]
+
+    def feed(self, user, query=""):
+        resp = self.client.get(f"/me/feed?limit=2{query}", headers=self.headers[user])
+        assert resp.status_code == 200
+        return resp.json
+
+    def test_fan_out_batch(self):
+        self.client.post("/me/following/2", headers=self.headers["bob"])
+        resp = self.client.post("/posts/batch", headers=self.headers["alice"],
+                                json=[{"title": "Alice 1", "content": "Content"},
+                                      {"title": "Alice 2", "content": "Content"}])
+        assert resp.status_code == 201
+        assert sorted(e.post_id for e in TimelineEntry.query.filter_by(user_id=1)) == [1, 2]
+        assert [post["title"] for post in self.feed("bob")["posts"]] == ["Alice 2", "Alice 1"]
+
+        self.client.post("/me/following/2", headers=self.headers["charlie"])
+        resp = self.client.post("/posts/batch", headers=self.headers["alice"],
+                                json=[{"title": "Alice 3", "content": "Content"}])
+        assert resp.status_code == 201
+        assert TimelineEntry.query.filter_by(post_id=3).count() == 0
+        assert [post["title"] for post in self.feed("charlie")["posts"]] == ["Alice 3", "Alice 2"]
+
+    def test_fan_out_and_celebrity_merge(self):
+        self.post("alice", "Alice 1")
+        self.client.post("/me/following/2", headers=self.headers["bob"])
+        self.client.post("/me/following/3", headers=self.headers["bob"])
+        self.client.post("/me/following/3", headers=self.headers["dave"])
+        assert TimelineEntry.query.filter_by(user_id=1).count() == 1
+
+        self.post("charlie", "Charlie 1")
+        self.post("alice", "Alice 2")
+        assert User.query.get(3).fanout_on_read
+        assert TimelineEntry.query.filter_by(user_id=1).count() == 2
+
+        feed = self.feed("bob")
+        assert [p["title"] for p in feed["posts"]] == ["Alice 2", "Charlie 1"]
+        feed = self.feed("bob", f"&cursor={feed['pagination']['next_cursor']}")
+        assert [p["title"] for p in feed["posts"]] == ["Alice 1"]
+        assert feed["pagination"]["next_cursor"] is None
+        assert [p["title"] for p in self.feed("bob", "&offset=1")["posts"]] == ["Charlie 1", "Alice 1"]
+        assert self.feed("bob", "&with_total=true")["pagination"]["total"] == 3
+
+    def test_retract_on_delete_and_unfollow(self):
+        self.client.post("/me/following/2", headers=self.headers["bob"])
+        post_id = self.post("alice", "Alice 1")
+        self.post("alice", "Alice 2")
+        assert len(self.feed("bob")["posts"]) == 2
+
+        resp = self.client.delete(f"/posts/{post_id}", headers=self.headers["alice"])
+        assert resp.status_code == 204
+        assert [p["title"] for p in self.feed("bob")["posts"]] == ["Alice 2"]
+
+        self.client.delete("/me/following/2", headers=self.headers["bob"])
+        assert self.feed("bob")["posts"] == []
+        assert TimelineEntry.query.count() == 0
@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema
+
+from api import schemas
+from api.models import db, Post, User
+from api.serialization import compile_dumper, orjson, OrjsonProvider
+from .base_test_case import BaseTestCase
+
+
+class TestSerialization(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        bob = User.query.get(1)
+        bob.about_me = "Café ☃ \x7f \"quoted\" \\ </script>"
+        alice = User(username="alice", email="alice@example.com", password="dog")
+        alice.last_seen = None
+        db.session.add(alice)
+        db.session.add(Post(author=bob, title="Title é", content="Line\nbreak\t\x01"))
+        db.session.add(Post(author=alice, title="Title", content="Content",
+                            created_at=datetime(2022, 1, 2, 3, 4, 5, 6)))
+        db.session.commit()
+
+    def test_compiled_dump_matches_marshmallow(self):
+        payloads = (
+            (schemas.PostPaginationSchema(), {"posts": Post.query.all(),
+                                              "pagination": {"limit": 10, "offset": 0, "next_cursor": None}}),
+            (schemas.UserPaginationSchema(), {"users": User.query.all(),
+                                              "pagination": {"limit": 10, "cursor": "abc", "next_cursor": "def"}}),
+            (schemas.PostOutSchema(), Post.query.get(2)),
+            (schemas.FollowResultListSchema(), {"results": [{"user_id": 1, "status": "followed"}]}),
+            (schemas.UserSchema(only=("username", "last_seen")), User.query.get(2)),
+        )
+        for schema, obj in payloads:
+            assert compile_dumper(schema)(obj) == Schema.dump(schema, obj)
+        assert schemas.UserSchema().dump(User.query.all(), many=True) == \
+            Schema.dump(schemas.UserSchema(), User.query.all(), many=True)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_output_matches_default(self):
+        default = DefaultJSONProvider(self.app)
+        fast = OrjsonProvider(self.app)
+        data = schemas.PostPaginationSchema().dump({"posts": Post.query.all(), "pagination": {"limit": 10}})
+        ascii_data = schemas.PostOutSchema().dump(Post.query.get(2))
+        for obj in (data, ascii_data, {"b": [1, None, True], "a": {"d": datetime(2022, 1, 1)}}, {1: "a"}):
+            assert fast.response(obj).get_data() == default.response(obj).get_data()
+
+        # Flask 2.3 no longer has legacy JSON settings
+        expected = default.dumps(ascii_data, separators=(",", ":"))
+        del self.app.config["JSON_SORT_KEYS"], self.app.config["JSON_AS_ASCII"]
+        assert fast.dumps(ascii_data, separators=(",", ":")) == expected
+
+    def test_responses_are_byte_identical(self):
+        urls = ("/posts", "/posts?limit=1", "/users", "/posts/1", "/users/1", "/users/1/posts")
+        fast = [self.client.get(url).get_data() for url in urls]
+        self.app.config["SCHEMA_COMPILED_DUMP"] = False
+        self.app.json = DefaultJSONProvider(self.app)
+        assert [self.client.get(url).get_data() for url in urls] == fast
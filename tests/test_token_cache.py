@@ -0,0 +1,79 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from api import create_app
+from api.token_cache import TokenCache
+from .base_test_case import BaseTestCase, TestConfig
+
+
+class TestTokenCache(BaseTestCase):
+    def test_expiration(self):
+        cache = TokenCache(ttl=60)
+        now = datetime.utcnow()
+        cache.set("token", 1, now + timedelta(seconds=10), now)
+        assert cache.get("token", now) == 1
+        assert cache.get("token", now + timedelta(seconds=11)) is None
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+        cache.set("token", 1, now + timedelta(hours=1), now)
+        assert cache.get("token", now + timedelta(seconds=61)) is None
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2)
+        now = datetime.utcnow()
+        expiration = now + timedelta(minutes=1)
+        cache.set("a", 1, expiration, now)
+        cache.set("b", 2, expiration, now)
+        assert cache.get("a", now) == 1
+        cache.set("c", 3, expiration, now)
+        assert cache.get("b", now) is None
+        assert cache.get("a", now) == 1
+        assert cache.get("c", now) == 3
+
+    def test_shared_invalidation(self):
+        path = os.path.join(tempfile.mkdtemp(), "invalidations")
+        worker1 = TokenCache(invalidation_file=path)
+        worker2 = TokenCache(invalidation_file=path)
+        now = datetime.utcnow()
+        expiration = now + timedelta(minutes=1)
+        for cache in (worker1, worker2):
+            cache.set("a", 1, expiration, now)
+            cache.set("b", 2, expiration, now)
+            assert cache.get("a", now) == 1
+
+        worker1.invalidate("a", expiration, now)
+        assert worker2.get("a", now) is None
+        assert worker2.get("b", now) == 2
+        assert worker2.is_revoked("a", now)
+
+        worker1.log.max_bytes = 0
+        worker1.invalidate("c", expiration, now)
+        assert worker2.get("b", now) is None
+        assert worker2.is_revoked("c", now)
+
+        worker3 = TokenCache(invalidation_file=path)
+        assert worker3.is_revoked("a", now)
+        assert not worker3.is_revoked("a", expiration + timedelta(seconds=2))
+
+    def test_invalidation_file_on_by_default(self):
+        assert self.app.extensions["token_cache"].log.path == TestConfig.TOKEN_CACHE_INVALIDATION_FILE
+
+        class DefaultConfig(TestConfig):
+            TOKEN_CACHE_INVALIDATION_FILE = None
+
+        app = create_app(DefaultConfig)
+        assert app.extensions["token_cache"].log.path == \
+            os.path.join(app.instance_path, "token-invalidations.log")
+
+    def test_stats_logged_periodically(self):
+        class StatsConfig(TestConfig):
+            TOKEN_CACHE_STATS_INTERVAL = 0.05
+
+        app = create_app(StatsConfig)
+        with self.assertLogs(app.logger, "INFO") as logs:
+            time.sleep(0.2)
+        app.extensions["token_cache_stats"].stop()
+        assert any("token-cache-stats returned {'hits': 0, 'misses': 0, 'size': 0}" in line
+                   for line in logs.output)
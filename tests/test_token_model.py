@@ -43,3 +43,34 @@ class TestTokenModel(BaseTestCase):
         db.session.commit()
 
         assert Token.query.all() == []
+
+    def test_purge_token_table(self):
+        u = User.query.filter_by(username="bob").first()
+        assert u is not None
+
+        for i in range(5):
+            t = Token(user=u)
+            t.generate()
+            if i < 4:
+                t.refresh_expiration = datetime.utcnow() - timedelta(days=2)
+            db.session.add(t)
+        db.session.commit()
+
+        assert Token.purge(batch_size=2) == 4
+        assert Token.query.count() == 1
+
+    def test_login_does_not_clean_tokens(self):
+        u = User.query.filter_by(username="bob").first()
+        t = Token(user=u)
+        t.generate()
+        t.refresh_expiration = datetime.utcnow() - timedelta(days=2)
+        db.session.add(t)
+        db.session.commit()
+
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        assert resp.status_code == 201
+        assert Token.query.count() == 2
+
+        result = self.app.test_cli_runner().invoke(args=["tokens", "purge", "--pause", "0"])
+        assert "Removed 1 expired tokens" in result.output
+        assert Token.query.count() == 1
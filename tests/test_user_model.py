@@ -1,8 +1,14 @@
+import atexit
+
 import pytest
+from datetime import timedelta
 from time import sleep
 
-from api.models import db, User
-from .base_test_case import BaseTestCase
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+from api.hashing import normalize_method, PasswordHasher
+from api.models import db, Post, User
+from .base_test_case import BaseTestCase, TestConfig
 
 
 class TestUserModel(BaseTestCase):
@@ -21,6 +27,36 @@ class TestUserModel(BaseTestCase):
         u2 = User(username="charlie", password="cat")
         assert u1.password_hash != u2.password_hash
 
+    def test_password_rehashed_on_login(self):
+        u = User.query.filter_by(username="bob").first()
+        assert u.password_hash.startswith("pbkdf2:sha256:1000$")
+        self.app.extensions["password_hasher"] = PasswordHasher("pbkdf2:sha256:2000")
+
+        resp = self.client.post("/tokens", auth=("bob", "dog"))
+        assert resp.status_code == 401
+        assert u.password_hash.startswith("pbkdf2:sha256:1000$")
+
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        assert resp.status_code == 201
+        db.session.expire_all()
+        u = User.query.filter_by(username="bob").first()
+        assert u.password_hash.startswith("pbkdf2:sha256:2000$")
+        assert u.verify_password("cat")
+
+    def test_password_hashing_is_bounded(self):
+        hasher = PasswordHasher("pbkdf2:sha256:1000", max_workers=1, max_pending=0)
+        self.app.extensions["password_hasher"] = hasher
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        assert resp.status_code == 503
+        hasher.shutdown()
+
+    def test_hash_method_defaults(self):
+        assert normalize_method("pbkdf2:sha256") == f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}"
+        assert normalize_method("pbkdf2") == f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}"
+        password_hash = User(password="cat").password_hash
+        assert not PasswordHasher("pbkdf2:sha256:1000", 0).needs_rehash(password_hash)
+        assert PasswordHasher("pbkdf2", 0).needs_rehash(password_hash)
+
     def test_ping(self):
         resp = self.client.post("/tokens", auth=("bob", "cat"))
         assert resp.status_code == 201
@@ -35,6 +71,32 @@ class TestUserModel(BaseTestCase):
         assert resp.status_code == 200
         assert ping != resp.json["last_seen"]
 
+    def test_ping_is_buffered(self):
+        u = User.query.filter_by(username="bob").first()
+        last_seen = u.last_seen
+        token = u.generate_access_token()
+        db.session.commit()
+
+        u1 = User.verify_access_token(token.access_token)
+        assert u1.last_seen > last_seen
+        db.session.expire_all()
+        assert User.query.get(1).last_seen == last_seen
+
+        User.flush_last_seen()
+        db.session.expire_all()
+        assert User.query.get(1).last_seen > last_seen
+
+    def test_ping_without_staleness(self):
+        self.app.extensions["last_seen"].staleness = timedelta(0)
+        u = User.query.filter_by(username="bob").first()
+        last_seen = u.last_seen
+        token = u.generate_access_token()
+        db.session.commit()
+
+        User.verify_access_token(token.access_token)
+        db.session.expire_all()
+        assert User.query.get(1).last_seen > last_seen
+
     def test_tokens(self):
         u = User.query.filter_by(username="bob").first()
         assert u is not None
@@ -84,3 +146,66 @@ class TestUserModel(BaseTestCase):
 
         assert u1.is_following(u2) == False 
         assert u2.is_followed_by(u1) == False
+
+    def test_follow_counters(self):
+        u1 = User.query.filter_by(username="bob").first()
+        u2 = User(username="alice", email="alice@example.com", password="dog")
+        db.session.add(u2)
+        db.session.commit()
+
+        u1.follow(u2)
+        u1.follow(u2)
+        db.session.commit()
+        assert (u1.following_count, u1.followers_count) == (1, 0)
+        assert (u2.following_count, u2.followers_count) == (0, 1)
+
+        u1.unfollow(u2)
+        db.session.commit()
+        assert u1.following_count == 0
+        assert u2.followers_count == 0
+
+    def test_recount(self):
+        u1 = User.query.filter_by(username="bob").first()
+        u2 = User(username="alice", email="alice@example.com", password="dog")
+        db.session.add_all([u2, Post(author=u1, title="Post", content="Content")])
+        u2.followers.append(u1)
+        db.session.commit()
+        assert u1.posts_count == 0
+
+        result = self.app.test_cli_runner().invoke(args=["users", "recount", "--batch-size", "1"])
+        assert "Recounted 2 users" in result.output
+        db.session.expire_all()
+        assert (u1.posts_count, u1.following_count) == (1, 1)
+        assert u2.followers_count == 1
+
+
+class FlushConfig(TestConfig):
+    LAST_SEEN_FLUSH_INTERVAL = 0.05
+
+
+class TestLastSeenFlush(BaseTestCase):
+    config = FlushConfig
+
+    def test_last_seen_flushed_in_background(self):
+        task = self.app.extensions["last_seen_flush"]
+        atexit.unregister(task.run_once)
+        assert task.is_alive()
+
+        u = User.query.filter_by(username="bob").first()
+        last_seen = u.last_seen
+        u.ping()
+        db.session.rollback()
+        for _ in range(50):
+            sleep(0.05)
+            db.session.expire_all()
+            if User.query.get(1).last_seen > last_seen:
+                break
+        assert User.query.get(1).last_seen > last_seen
+        task.stop()
+
+        u = User.query.get(1)
+        u.ping()
+        db.session.rollback()
+        task.run_once()
+        db.session.expire_all()
+        assert len(self.app.extensions["last_seen"]) == 0
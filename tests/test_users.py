@@ -1,3 +1,10 @@
+import json
+import os
+import tempfile
+
+from api.models import db, User
+from api.search import load_username_index
+from api.username_index import UsernameIndex
 from .base_test_case import BaseTestCase
 
 
@@ -37,6 +44,32 @@ class TestUsers(BaseTestCase):
         resp = self.client.get("/users/555")
         assert resp.status_code == 404
 
+    def test_conditional_get(self):
+        resp = self.client.get("/users/1")
+        etag = resp.headers["ETag"]
+        resp = self.client.get("/users/1", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        resp = self.client.get("/users/bob", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+        resp = self.client.get("/users/bob", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+        resp = self.client.post("/tokens", auth=("bob", "cat"))
+        headers = {"Authorization": f"Bearer {resp.json['access_token']}"}
+        resp = self.client.put("/me", headers=headers, json={"about_me": "Hello"})
+        assert resp.status_code == 200
+        resp = self.client.get("/users/bob", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.json["about_me"] == "Hello"
+
+        resp = self.client.get("/users")
+        etag = resp.headers["ETag"]
+        resp = self.client.get("/users", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        resp = self.client.get("/users?limit=1", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+
     def test_retrieve_user_by_username(self):
         resp = self.client.get("/users/bob")
         assert resp.status_code == 200
@@ -50,6 +83,62 @@ class TestUsers(BaseTestCase):
         resp = self.client.get("/users/alice")
         assert resp.status_code == 404
 
+    def add_users(self, *usernames):
+        for username in usernames:
+            db.session.add(User(username=username, email=f"{username}@example.com", password="cat"))
+        db.session.commit()
+
+    def test_search_users(self):
+        self.add_users("Bobby", "bobcat", "boa", "alice", "BOB2")
+        User.query.filter_by(username="bobcat").first().followers_count = 5
+        db.session.commit()
+
+        resp = self.client.get("/users/search?prefix=BOB")
+        assert resp.status_code == 200
+        assert [user["username"] for user in resp.json["users"]] == ["bob", "bobcat", "BOB2", "Bobby"]
+
+        resp = self.client.get("/users/search?prefix=bo&limit=2")
+        assert [user["username"] for user in resp.json["users"]] == ["bobcat", "boa"]
+
+        resp = self.client.get("/users/search?prefix=x")
+        assert resp.json["users"] == []
+
+        resp = self.client.get("/users/search")
+        assert resp.status_code == 400
+
+        resp = self.client.post("/users", json={"username": "Search", "email": "s@example.com",
+                                                "password": "cat"})
+        assert resp.status_code == 400
+
+    def test_search_users_index(self):
+        self.app.extensions["username_index"] = index = UsernameIndex()
+        self.add_users("bobby", "alice")
+
+        # database is searched until index is loaded in background
+        resp = self.client.get("/users/search?prefix=b")
+        assert [user["username"] for user in resp.json["users"]] == ["bob", "bobby"]
+        assert len(index) == 0
+        assert load_username_index() == 3
+
+        # users added by other workers show up on next reload only
+        self.add_users("bea")
+        resp = self.client.get("/users/search?prefix=b")
+        assert [user["username"] for user in resp.json["users"]] == ["bob", "bobby"]
+        load_username_index()
+
+        resp = self.client.post("/users", json={"username": "Boa", "email": "boa@example.com",
+                                                "password": "cat"})
+        assert resp.status_code == 201
+        access_token = self.client.post("/tokens", auth=("bob", "cat")).json["access_token"]
+        resp = self.client.put("/me", headers={"Authorization": f"Bearer {access_token}"},
+                               json={"username": "carl"})
+        assert resp.status_code == 200
+
+        resp = self.client.get("/users/search?prefix=b")
+        assert [user["username"] for user in resp.json["users"]] == ["bea", "Boa", "bobby"]
+        resp = self.client.get("/users/search?prefix=CA")
+        assert [user["username"] for user in resp.json["users"]] == ["carl"]
+
     def test_retrieve_authenticated_user(self):
         resp = self.client.post("/tokens", auth=("bob", "cat"))
         assert resp.status_code == 201
@@ -90,3 +179,53 @@ class TestUsers(BaseTestCase):
         resp = self.client.put("/me", headers={"Authorization": f"Bearer {access_token}"}, json=wrong_data)
         assert resp.status_code == 400
 
+
+    def import_users(self, name, content, *args):
+        path = os.path.join(tempfile.mkdtemp(), name)
+        with open(path, "w") as f:
+            f.write(content)
+        return self.app.test_cli_runner(mix_stderr=False).invoke(args=["users", "import", path, *args])
+
+    def test_import_users_csv(self):
+        rows = ["username,email,password,about_me,extra"]
+        rows += [f"user{i},user{i}@example.com,pass{i},About {i},x" for i in range(30)]
+        rows += ["bob,other@example.com,pass,,", "user0,again@example.com,pass,,",
+                 "zed,not-an-email,pass,,", "yan,bob@example.com,pass,,"]
+        result = self.import_users("users.csv", "\n".join(rows), "--chunk-size", "7", "--workers", "2")
+        assert result.exit_code == 0
+        assert "Imported 30 users, rejected 4" in result.stdout
+        assert "Record 31: username: Username already in use" in result.stderr
+        assert "Record 32: username: Username already in use" in result.stderr
+        assert "Record 33: email:" in result.stderr
+        assert "Record 34: email: Email already in use" in result.stderr
+
+        user = User.query.filter_by(username="user29").first()
+        assert user.about_me == "About 29"
+        assert user.verify_password("pass29")
+        assert user.followers_count == 0
+        resp = self.client.post("/tokens", auth=("user3", "pass3"))
+        assert resp.status_code == 201
+
+    def test_import_users_ndjson(self):
+        records = [json.dumps({"username": "alice", "email": "alice@example.com", "password": "dog"}),
+                   "{broken", json.dumps({"username": "al", "email": "al@example.com", "password": "x"})]
+        result = self.import_users("users.ndjson", "\n".join(records), "--workers", "0")
+        assert result.exit_code == 0
+        assert "Imported 1 users, rejected 2" in result.stdout
+        assert "Record 2: Invalid JSON" in result.stderr
+        assert User.query.filter_by(username="alice").first().verify_password("dog")
+        assert User.query.filter_by(username_lower="alice").count() == 1
+
+    def test_import_users_mixed_keys(self):
+        records = [{"username": "alice", "email": "alice@example.com", "password": "dog", "about_me": "hi"},
+                   {"username": "carol", "email": "carol@example.com", "password": "dog"},
+                   {"username": "al", "email": "al@example.com", "password": "x"},
+                   {"username": "bob", "email": "bob2@example.com", "password": "x"},
+                   {"username": "zed", "email": "zed", "password": "x"}]
+        result = self.import_users("users.ndjson", "\n".join(map(json.dumps, records)), "--workers", "0")
+        assert result.exit_code == 0
+        assert "Imported 2 users, rejected 3" in result.stdout
+        assert [line.split(":")[0] for line in result.stderr.splitlines()] == \
+            ["Record 3", "Record 4", "Record 5"]
+        assert User.query.filter_by(username="alice").first().about_me == "hi"
+        assert User.query.filter_by(username="carol").first().about_me is None